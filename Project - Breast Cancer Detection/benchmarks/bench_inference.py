@@ -0,0 +1,73 @@
+# Importing the required libraries
+import os
+
+# The legacy baseline needs the sklearn pipelines, not the exported coefficients
+os.environ.setdefault("ONCOAI_MODEL_BACKEND", "sklearn")
+
+from scripts.helping_functions import predict_diagnosis, FEATURES, registry
+from scripts.data_stream import generate_sample
+import scripts.helping_functions
+import numpy as np
+import warnings
+import timeit
+
+# Ignore the warnings (sklearn feature names on plain arrays)
+warnings.filterwarnings("ignore")
+
+# Time the model itself, not the prediction cache
+scripts.helping_functions.prediction_cache = None
+
+# The active model version
+loaded_model = registry.get()
+model, compiled_model = loaded_model.pipeline, loaded_model.compiled
+
+# Number of synthetic samples and timed calls
+N_SAMPLES = 1000
+N_CALLS = 2000
+
+
+def legacy_predict_diagnosis(validated_data: dict) -> dict:
+    """The previous two-pass implementation (predict, then predict_proba), kept as the baseline."""
+    input_array = np.array([validated_data[key] for key in FEATURES]).reshape(1, -1)
+    prediction = model.predict(input_array)[0]
+    probabilities = model.predict_proba(input_array)[0]
+    return {
+        "diagnosis": "Malignant" if prediction == 1 else "Benign",
+        "confidence": round(probabilities[prediction] * 100, 2),
+    }
+
+
+def time_per_call(function, samples: list) -> float:
+    """Return the mean latency of one call in microseconds."""
+    iterator = iter(samples * (N_CALLS // len(samples) + 1))
+    seconds = timeit.timeit(lambda: function(next(iterator)), number=N_CALLS)
+    return seconds / N_CALLS * 1e6
+
+
+if __name__ == "__main__":
+    # Generating the synthetic samples from the benign/malignant centroids
+    samples = [generate_sample() for _ in range(N_SAMPLES)]
+
+    # Checking that every path produces the same numbers
+    def outputs(result: dict) -> tuple:
+        return result["diagnosis"], result["confidence"]
+
+    legacy = [outputs(legacy_predict_diagnosis(sample)) for sample in samples]
+    single_pass = [outputs(predict_diagnosis(sample, use_compiled=False)) for sample in samples]
+    compiled = [outputs(predict_diagnosis(sample)) for sample in samples]
+    assert legacy == single_pass, "Single-pass sklearn path differs from the legacy path"
+    assert legacy == compiled, "Compiled path differs from the legacy path"
+
+    input_array = np.array([[sample[key] for key in FEATURES] for sample in samples])
+    sklearn_probabilities = model.predict_proba(input_array)[:, 1]
+    print(f"Compiled model available : {compiled_model is not None}")
+    if compiled_model is not None:
+        weights, bias = compiled_model
+        folded_probabilities = 1.0 / (1.0 + np.exp(-(input_array @ weights + bias)))
+        print(f"Max probability delta    : {np.abs(folded_probabilities - sklearn_probabilities).max():.2e}")
+
+    # Timing each path
+    print(f"Legacy (predict + proba) : {time_per_call(legacy_predict_diagnosis, samples):8.1f} µs/call")
+    print(f"Single-pass sklearn      : "
+          f"{time_per_call(lambda s: predict_diagnosis(s, use_compiled=False), samples):8.1f} µs/call")
+    print(f"Compiled (dot + sigmoid) : {time_per_call(predict_diagnosis, samples):8.1f} µs/call")
@@ -0,0 +1,84 @@
+# Importing the required libraries
+from scripts.model_registry import ModelRegistry
+from scripts.data_stream import generate_samples
+import scripts.helping_functions as helping_functions
+import numpy as np
+import subprocess
+import warnings
+import timeit
+import sys
+import os
+
+# Ignore the warnings (sklearn feature names on plain arrays)
+warnings.filterwarnings("ignore")
+
+# Time the model itself, not the prediction cache
+helping_functions.prediction_cache = None
+
+# Cold starts per backend, timed calls and batch size
+N_STARTS = 5
+N_CALLS = 5000
+BATCH_SIZE = 1000
+
+# Imports the helpers and loads the active model in a fresh interpreter, then reports the elapsed time
+# and whether scikit-learn was imported
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import scripts.helping_functions as helping_functions
+helping_functions.registry.get()
+print(time.perf_counter() - start, "sklearn" in __import__("sys").modules)
+"""
+
+
+def cold_start(backend: str) -> tuple:
+    """Return the best (seconds to a loaded model, process wall seconds) of fresh interpreters."""
+    timings = []
+    for _ in range(N_STARTS):
+        environment = dict(os.environ, ONCOAI_MODEL_BACKEND=backend, PYTHONWARNINGS="ignore")
+        start = timeit.default_timer()
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], env=environment, capture_output=True,
+                                text=True, check=True).stdout.split()
+        timings.append((float(output[0]), timeit.default_timer() - start, output[1] == "True"))
+    return min(timings)
+
+
+def per_call(function, samples: list) -> float:
+    """Return the mean latency of one call in microseconds."""
+    iterator = iter(samples * (N_CALLS // len(samples) + 1))
+    return timeit.timeit(lambda: function(next(iterator)), number=N_CALLS) / N_CALLS * 1e6
+
+
+if __name__ == "__main__":
+    if not any(helping_functions.MODELS_DIR.glob("*.npz")):
+        sys.exit("No exported coefficients, run `python -m scripts.model_registry` first")
+
+    print(f"{'Backend':<10} {'import + load ms':>16} {'process ms':>11} {'sklearn imported':>17}")
+    for backend in ("sklearn", "numpy"):
+        load_seconds, process_seconds, sklearn_imported = cold_start(backend)
+        print(f"{backend:<10} {load_seconds * 1000:16.0f} {process_seconds * 1000:11.0f} {str(sklearn_imported):>17}")
+
+    # The same samples scored through each backend
+    samples = generate_samples(1000)
+    batch = np.array([[row[key] for key in helping_functions.FEATURES] for row in samples[:BATCH_SIZE]])
+    registries = {backend: ModelRegistry(helping_functions.MODELS_DIR, backend=backend)
+                  for backend in ("sklearn", "numpy")}
+    paths = [
+        ("sklearn pipeline", registries["sklearn"], False),
+        ("folded (joblib)", registries["sklearn"], True),
+        ("numpy (.npz)", registries["numpy"], True),
+    ]
+
+    print(f"\n{'Path':<18} {'single µs':>10} {f'batch {BATCH_SIZE} µs':>15}")
+    for label, registry, use_compiled in paths:
+        helping_functions.registry = registry
+        single = per_call(lambda sample: helping_functions.predict_diagnosis(sample, use_compiled), samples)
+        loaded_model = registry.get()
+        batch_seconds = min(timeit.repeat(lambda: loaded_model.malignant_probabilities(batch, use_compiled),
+                                          number=100, repeat=5)) / 100
+        print(f"{label:<18} {single:10.1f} {batch_seconds * 1e6:15.1f}")
+
+    # The exported scorer gives the probabilities of the pipeline
+    expected = registries["sklearn"].get().malignant_probabilities(batch, use_compiled=False)
+    exported = registries["numpy"].get().malignant_probabilities(batch)
+    print(f"\nMax probability difference (numpy vs sklearn): {np.abs(exported - expected).max():.2e}")
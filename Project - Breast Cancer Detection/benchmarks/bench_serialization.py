@@ -0,0 +1,87 @@
+# Importing the required libraries
+from scripts.serialization import JSON_PROVIDERS, compress
+from scripts.helping_functions import predict_diagnoses, short_patient_id
+from scripts.data_stream import generate_samples
+from datetime import datetime as dt, timedelta
+import importlib.util
+import warnings
+import timeit
+import main
+
+# Ignore the warnings (sklearn feature names on plain arrays)
+warnings.filterwarnings("ignore")
+
+# Number of records of the /patients payload, and timed repeats
+N_RECORDS = 10000
+N_REPEATS = 5
+
+
+def legacy_to_dict(record, fields: list = None) -> dict:
+    """The previous per-field dispatch of Record.to_dict, kept as the baseline."""
+    result = {}
+    for field in main.RECORD_FIELDS if fields is None else fields:
+        if field == "created_at":
+            result["created_at"] = record.created_at.isoformat() if record.created_at else None
+        elif field == "patient_id":
+            result["patient_id"] = record.patient_id
+            result["patient_short_id"] = short_patient_id(record.patient_id)
+        elif field == "feedbacks":
+            result["feedbacks"] = [
+                {
+                    "feedback_id": f.feedback_id,
+                    "feedback_body": f.feedback_body,
+                    "created_at": f.created_at.isoformat() if f.created_at else None,
+                }
+                for f in record.feedbacks
+            ]
+        else:
+            result[field] = getattr(record, field)
+    return result
+
+
+def best_of(function) -> float:
+    """Return the best wall time of the function in milliseconds."""
+    return min(timeit.repeat(function, number=1, repeat=N_REPEATS)) * 1000
+
+
+if __name__ == "__main__":
+    # In-memory records shaped like the stored ones
+    samples = generate_samples(N_RECORDS)
+    now = dt.now()
+    records = []
+    for index, (sample, result) in enumerate(zip(samples, predict_diagnoses(samples))):
+        record = main.build_record(sample, result)
+        record.id, record.created_at = index + 1, now - timedelta(seconds=index)
+        records.append(record)
+
+    # The serializers compared, with the datetime handling their encoder needs
+    installed = [name for name in JSON_PROVIDERS if name == "flask" or importlib.util.find_spec(name)]
+    with main.app.app_context():
+        print(f"{N_RECORDS} records, /patients payload")
+        print(f"{'Path':<34} {'to_dict ms':>11} {'encode ms':>10} {'total ms':>9}")
+
+        legacy_provider = JSON_PROVIDERS["flask"](main.app)
+        items = [legacy_to_dict(record) for record in records]
+        to_dict_ms = best_of(lambda: [legacy_to_dict(record) for record in records])
+        encode_ms = best_of(lambda: legacy_provider.response(items))
+        body = legacy_provider.response(items).get_data()
+        print(f"{'dispatch to_dict + flask (baseline)':<34} {to_dict_ms:11.1f} {encode_ms:10.1f} {to_dict_ms + encode_ms:9.1f}")
+
+        for name in installed:
+            provider = JSON_PROVIDERS[name](main.app)
+            serializer = main.record_serializer(tuple(main.RECORD_FIELDS), name != "flask")
+            items = [serializer(record) for record in records]
+            to_dict_ms = best_of(lambda: [serializer(record) for record in records])
+            encode_ms = best_of(lambda: provider.response(items))
+            print(f"{'compiled to_dict + ' + name:<34} {to_dict_ms:11.1f} {encode_ms:10.1f} {to_dict_ms + encode_ms:9.1f}")
+
+    # Bytes on the wire of the baseline body, and the time to compress it
+    print(f"\n{'Encoding':<34} {'bytes':>11} {'ratio':>10} {'time ms':>9}")
+    print(f"{'identity':<34} {len(body):11d} {1:10.2f} {0:9.1f}")
+    encodings = [("gzip", level) for level in (1, 6)]
+    if importlib.util.find_spec("brotli"):
+        encodings += [("br", quality) for quality in (4, 11)]
+    for encoding, level in encodings:
+        compressed = compress(body, encoding, level)
+        elapsed = best_of(lambda: compress(body, encoding, level))
+        print(f"{f'{encoding} level {level}':<34} {len(compressed):11d} {len(body) / len(compressed):10.2f} {elapsed:9.1f}")
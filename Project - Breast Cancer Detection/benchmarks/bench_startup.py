@@ -0,0 +1,92 @@
+# Importing the required libraries
+import subprocess
+import argparse
+import tempfile
+import timeit
+import sys
+import os
+
+# Serving profiles compared: (label, environment)
+PROFILES = [
+    ("sklearn, eager load", {"ONCOAI_MODEL_BACKEND": "sklearn", "ONCOAI_MODEL_LOADING": "eager"}),
+    ("sklearn, background load", {"ONCOAI_MODEL_BACKEND": "sklearn", "ONCOAI_MODEL_LOADING": "background"}),
+    ("auto (.npz), eager load", {"ONCOAI_MODEL_BACKEND": "auto", "ONCOAI_MODEL_LOADING": "eager"}),
+    ("numpy, eager load", {"ONCOAI_MODEL_BACKEND": "numpy", "ONCOAI_MODEL_LOADING": "eager"}),
+    ("numpy, background load", {"ONCOAI_MODEL_BACKEND": "numpy", "ONCOAI_MODEL_LOADING": "background"}),
+]
+
+# Imports the app, starts the registry threads like a worker does, and polls /health until it is ready;
+# prints the seconds to the end of the import and to readiness
+READINESS_SCRIPT = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.helping_functions.registry.start()
+client = main.app.test_client()
+while client.get("/health").status_code != 200:
+    time.sleep(0.001)
+print(imported - start, time.perf_counter() - start)
+"""
+
+
+def import_times(environment: dict) -> tuple:
+    """
+    Run `python -X importtime -c 'import main'`.
+    :return: Tuple (names of all the imported modules, [(cumulative µs, module)] of the direct imports of main).
+    """
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], env=environment,
+                            capture_output=True, text=True, check=True).stderr
+    modules, children = set(), []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.add(name.strip())
+
+        # A module is listed after its own imports: the depth 1 lines before `main` are its direct imports
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0 and name.strip() != "main":
+            children = []
+        elif depth == 0:
+            break
+    return modules, children
+
+
+def readiness(environment: dict, runs: int) -> tuple:
+    """Return the best (seconds to import main, seconds until /health answers 200) of fresh processes."""
+    timings = []
+    for _ in range(runs):
+        start = timeit.default_timer()
+        output = subprocess.run([sys.executable, "-c", READINESS_SCRIPT], env=environment, capture_output=True,
+                                text=True, check=True).stdout.split()
+        timings.append((float(output[0]), float(output[1]), timeit.default_timer() - start))
+    return min(timings, key=lambda timing: timing[2])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the cold start of the serving profiles.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per profile (the best one is kept).")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest direct imports of main listed per profile.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        base = dict(os.environ, PYTHONWARNINGS="ignore", ONCOAI_DATABASE_URI=f"sqlite:///{directory}/startup.db")
+        print(f"{'Profile':<26} {'import main ms':>15} {'ready ms':>9} {'process ms':>11}")
+        reports = []
+        for label, settings in PROFILES:
+            environment = dict(base, **settings)
+            imported, ready, process = readiness(environment, args.runs)
+            print(f"{label:<26} {imported * 1000:15.0f} {ready * 1000:9.0f} {process * 1000:11.0f}")
+            reports.append((label, import_times(environment)))
+
+    # The importtime report: the heaviest modules imported by main itself, and whether the heavy
+    # optional dependencies were loaded at all
+    for label, (modules, children) in reports:
+        print(f"\n{label}: -X importtime, heaviest direct imports of main")
+        for cumulative, name in sorted(children, reverse=True)[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  {name}")
+        print("  imported by main: " + ", ".join(f"{package}={'yes' if package in modules else 'no'}"
+                                                  for package in ("sklearn", "scipy", "joblib", "pandas")))
@@ -0,0 +1,86 @@
+# Importing the required libraries
+from scripts.helping_functions import predict_diagnoses, validate_batch_input
+from scripts.feature_storage import pack_feature_rows
+from scripts.data_stream import generate_samples
+from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
+import tempfile
+import warnings
+import time
+import main
+import gc
+import os
+
+# Ignore the warnings (sklearn feature names on plain arrays)
+warnings.filterwarnings("ignore")
+
+# Number of records inserted and serialized per layout, and timed repeats of the serialization
+N_RECORDS = 20000
+N_REPEATS = 3
+
+# Serialized fields, the feedbacks (one extra query) aside
+SERIALIZED_FIELDS = [field for field in main.RECORD_FIELDS if field != "feedbacks"]
+
+# Storage layouts compared: (label, feature storage, blob dtype)
+LAYOUTS = [
+    ("30 float columns", "columns", "float64"),
+    ("packed float64", "packed", "float64"),
+    ("packed float32", "packed", "float32"),
+]
+
+
+def insert_records(engine, samples: list, results: list, input_array) -> float:
+    """Build and commit the records the way /predict/batch does, return the elapsed seconds."""
+    start = time.perf_counter()
+    if main.FEATURE_STORAGE == "packed":
+        blobs = pack_feature_rows(input_array, main.FEATURE_BLOB_DTYPE)
+    else:
+        blobs = [None] * len(samples)
+    with Session(engine) as session:
+        session.add_all([main.build_record(*item) for item in zip(samples, results, blobs)])
+        session.commit()
+    return time.perf_counter() - start
+
+
+def table_bytes(engine) -> int:
+    """Size of the pages of the RECORDS table (row payloads and b-tree overhead)."""
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT SUM(pgsize) FROM dbstat WHERE name = 'RECORDS'").scalar()
+
+
+def serialize_records(engine) -> tuple:
+    """Load and serialize all the records like /patients does, return the best (load, to_dict) seconds."""
+    timings = []
+    for _ in range(N_REPEATS):
+        gc.collect()
+        with Session(engine) as session:
+            query = session.query(main.Record).order_by(main.Record.created_at.desc(), main.Record.id.desc())
+            start = time.perf_counter()
+            records = query.all()
+            loaded = time.perf_counter()
+            [record.to_dict(SERIALIZED_FIELDS) for record in records]
+            timings.append((loaded - start, time.perf_counter() - loaded))
+    return min(load for load, _ in timings), min(serialize for _, serialize in timings)
+
+
+if __name__ == "__main__":
+    # The same scored samples for every layout
+    samples = generate_samples(N_RECORDS)
+    input_array, _ = validate_batch_input(samples)
+    results = predict_diagnoses(samples, input_array=input_array)
+
+    print(f"{N_RECORDS} records")
+    print(f"{'Layout':<18} {'insert rec/s':>13} {'bytes/row':>10} {'load ms':>9} {'to_dict ms':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, storage, dtype in LAYOUTS:
+            main.FEATURE_STORAGE, main.FEATURE_BLOB_DTYPE = storage, dtype
+            engine = create_engine(f"sqlite:///{os.path.join(directory, storage + dtype)}.db")
+            main.db.metadata.create_all(engine)
+
+            insert_seconds = insert_records(engine, samples, results, input_array)
+            row_bytes = table_bytes(engine) / N_RECORDS
+            load_seconds, serialize_seconds = serialize_records(engine)
+            engine.dispose()
+
+            print(f"{label:<18} {N_RECORDS / insert_seconds:13.0f} {row_bytes:10.0f} "
+                  f"{load_seconds * 1000:9.1f} {serialize_seconds * 1000:11.1f}")
@@ -0,0 +1,37 @@
+# Importing the required libraries
+from scripts.helping_functions import validation_errors, validate_batch_input, FEATURES
+from scripts.data_stream import generate_samples
+import timeit
+
+# Batch size and timed calls of the single record path
+BATCH_SIZE = 10000
+N_CALLS = 20000
+
+
+def legacy_validate_input(input_data: dict) -> bool:
+    """The previous implementation (presence, then type per key), kept as the baseline."""
+    if not all(key in input_data for key in FEATURES):
+        return False
+    for key in FEATURES:
+        value = input_data[key]
+        if value is None or not isinstance(value, (int, float)):
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    # Generating the synthetic samples from the benign/malignant centroids
+    rows = generate_samples(BATCH_SIZE)
+    sample = rows[0]
+
+    # Single record: the legacy check versus the full schema (presence, type, finiteness, range)
+    legacy = timeit.timeit(lambda: legacy_validate_input(sample), number=N_CALLS) / N_CALLS * 1e6
+    schema = timeit.timeit(lambda: validation_errors(sample), number=N_CALLS) / N_CALLS * 1e6
+    print(f"Single record, legacy      : {legacy:8.2f} µs/call")
+    print(f"Single record, schema      : {schema:8.2f} µs/call")
+
+    # Batch: per-record loop versus the vectorized batch validation
+    loop = min(timeit.repeat(lambda: [validation_errors(row) for row in rows], number=1, repeat=5))
+    batch = min(timeit.repeat(lambda: validate_batch_input(rows), number=1, repeat=5))
+    print(f"{BATCH_SIZE} rows, record loop  : {loop * 1000:8.1f} ms")
+    print(f"{BATCH_SIZE} rows, vectorized   : {batch * 1000:8.1f} ms")
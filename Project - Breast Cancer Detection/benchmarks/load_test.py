@@ -0,0 +1,34 @@
+# Importing the required libraries
+from scripts.data_stream import run_load, print_report, percentile
+import argparse
+import asyncio
+
+# Target of the production serving mode on a 4-core box (gunicorn -c gunicorn.conf.py main:app, 4 workers x 4
+# threads, the load generator on another machine): 400 requests/sec offered on a fixed schedule, kept with at most
+# 1% missed slots and a p99 latency under 250 ms measured from the scheduled send times
+TARGET_RPS = 400
+TARGET_MAX_MISSED = 0.01
+TARGET_P99_MS = 250
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the /predict endpoint of the OncoAI API.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/predict")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="Closed-loop clients, or the connection cap with --rps.")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="Offered request rate (open loop); clients send as fast as answered when omitted.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Test duration in seconds.")
+    args = parser.parse_args()
+
+    # Closed-loop clients as fast as the server answers, or requests sent on a fixed schedule
+    report = asyncio.run(run_load(args.url, args.concurrency, args.rps, args.duration))
+    print_report(report)
+
+    # Checking an open-loop run at the target rate against the target
+    if args.rps and args.rps >= TARGET_RPS:
+        sent = report["sent"]
+        met = (report["failed"] == 0 and report["missed"] <= TARGET_MAX_MISSED * sent
+               and percentile(report["latencies"], 99) <= TARGET_P99_MS)
+        print(f"Target     : {TARGET_RPS} req/s, <= {TARGET_MAX_MISSED:.0%} missed slots, p99 <= {TARGET_P99_MS} ms "
+              f"-> {'met' if met else 'not met'}")
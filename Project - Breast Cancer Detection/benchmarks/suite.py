@@ -0,0 +1,220 @@
+# Importing the required libraries
+from datetime import datetime as dt, timedelta
+from pathlib import Path
+import tempfile
+import argparse
+import platform
+import warnings
+import shutil
+import atexit
+import timeit
+import json
+import sys
+import os
+
+# The suite works on a scratch database, never on main.db (set before main is imported)
+DATA_DIR = tempfile.mkdtemp(prefix="oncoai-bench-")
+os.environ["ONCOAI_DATABASE_URI"] = f"sqlite:///{DATA_DIR}/bench.db"
+atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+
+# Ignore the warnings (model unpickling, sklearn feature names on plain arrays)
+warnings.filterwarnings("ignore")
+
+from scripts.helping_functions import validate_input, predict_diagnosis, predict_diagnoses, validate_batch_input
+from scripts.data_stream import generate_samples
+import scripts.helping_functions
+import numpy as np
+import main
+
+# Time the model itself, not the prediction cache
+scripts.helping_functions.prediction_cache = None
+
+# Stored baselines, compared with the current run
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+
+# Table sizes of the /patients cases, and the largest one also read without pagination (/patients and the
+# NDJSON export). The unpaginated reads of the 1M table are out of scope: a body of about 1.1 GB, which
+# clients never request (they page, or stream the export), and over a minute per call
+TABLE_SIZES = (1000, 100000, 1000000)
+FULL_LISTING_MAX_ROWS = 100000
+
+# Synthetic samples reused to fill the table, and rows per insert
+POOL_SIZE = 10000
+INSERT_CHUNK = 20000
+
+# Rows of the batch and serialization cases
+BATCH_SIZE = 1000
+
+# Serialized fields, the feedbacks (one extra query per record) aside
+SERIALIZED_FIELDS = [field for field in main.RECORD_FIELDS if field != "feedbacks"]
+
+
+def measure(function, number: int, repeat: int) -> float:
+    """Return the best time of one call in seconds, over `repeat` runs of `number` calls."""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def format_seconds(seconds: float) -> str:
+    """Format a duration with the unit that fits it."""
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.2f} s"
+
+
+def populate(target: int, pool: list, results: list) -> None:
+    """Grow the RECORDS table to `target` rows, one second apart, inserted by chunks of one executemany."""
+    start = dt(2024, 1, 1)
+    with main.app.app_context():
+        current = main.db.session.query(main.Record).count()
+    for chunk_start in range(current, target, INSERT_CHUNK):
+        rows = []
+        for index in range(chunk_start, min(target, chunk_start + INSERT_CHUNK)):
+            row = main.record_values(pool[index % POOL_SIZE], results[index % POOL_SIZE])
+            row["created_at"] = start + timedelta(seconds=index)
+            rows.append(row)
+        main.write_records(rows)
+
+
+def cursor_at(position: int) -> str:
+    """Pagination cursor of the record at the given position of the /patients order."""
+    with main.app.app_context():
+        record = (
+            main.Record.query.order_by(main.Record.created_at.desc(), main.Record.id.desc())
+            .offset(position).first()
+        )
+        return main.encode_cursor(record)
+
+
+def get_ok(client, url: str) -> None:
+    """GET a URL with the test client, reading the whole body (streamed too), failing the run on an error status."""
+    response = client.get(url, buffered=True)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} answered {response.status_code}")
+
+
+def run_suite(sizes: list, repeat: int) -> dict:
+    """Run every case and return the best seconds per call of each, by case name."""
+    main.init_database()
+    client = main.app.test_client()
+    pool = generate_samples(POOL_SIZE, np.random.default_rng(0))
+    input_array, _ = validate_batch_input(pool)
+    pool_results = predict_diagnoses(pool, input_array=input_array)
+    batch, batch_array = pool[:BATCH_SIZE], input_array[:BATCH_SIZE]
+    timings = {}
+
+    def case(name: str, function, number: int) -> None:
+        timings[name] = measure(function, number, repeat)
+        print(f"{name:<44} {format_seconds(timings[name]):>12}", flush=True)
+
+    # Validation and inference
+    case("validate_input", lambda: validate_input(pool[0]), 5000)
+    samples = iter(pool * 100)
+    case("predict_diagnosis", lambda: predict_diagnosis(next(samples)), 5000)
+    case(f"predict_diagnoses ({BATCH_SIZE} rows)", lambda: predict_diagnoses(batch, input_array=batch_array), 50)
+
+    # End-to-end prediction, stored in the database (then cleared for the listing cases)
+    samples = iter(pool * 100)
+    case("POST /predict", lambda: client.post("/predict", json=next(samples)), 200)
+    with main.app.app_context():
+        main.Record.query.delete()
+        main.db.session.commit()
+
+    # Listing, on tables of growing sizes
+    for size in sorted(sizes):
+        print(f"Filling the table to {size} rows...", flush=True)
+        populate(size, pool, pool_results)
+
+        if size == min(sizes):
+            with main.app.app_context():
+                records = main.Record.query.limit(BATCH_SIZE).all()
+                case(f"Record.to_dict ({len(records)} records)",
+                     lambda: [record.to_dict(SERIALIZED_FIELDS) for record in records], 10)
+
+        case(f"GET /patients first page ({size} rows)", lambda: get_ok(client, "/patients?limit=100"), 50)
+        deep_url = f"/patients?limit=100&cursor={cursor_at(int(size * 0.9))}"
+        case(f"GET /patients page at 90% ({size} rows)", lambda: get_ok(client, deep_url), 50)
+        if size <= FULL_LISTING_MAX_ROWS:
+            number = max(1, 5000 // size)
+            case(f"GET /patients all ({size} rows)", lambda: get_ok(client, "/patients"), number)
+            case(f"GET /patients/export ndjson ({size} rows)", lambda: get_ok(client, "/patients/export"), number)
+
+    return timings
+
+
+def cpu_model() -> str:
+    """Name of the CPU model (from /proc/cpuinfo on Linux)."""
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or None
+
+
+def memory_gb() -> float:
+    """Physical memory in GB, None where the platform does not report it."""
+    try:
+        return round(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1e9, 1)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def machine() -> dict:
+    """Describe the machine the timings were taken on."""
+    return {"platform": platform.platform(), "processor": platform.machine(), "cpu_model": cpu_model(),
+            "cpus": os.cpu_count(), "memory_gb": memory_gb(), "python": platform.python_version()}
+
+
+def compare(timings: dict, baselines: dict, threshold: float) -> list:
+    """Print the change of every case against its baseline and return the names of the regressions."""
+    regressions = []
+    print(f"\n{'Case':<44} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, seconds in timings.items():
+        baseline = baselines["results"].get(name)
+        if baseline is None:
+            print(f"{name:<44} {'-':>12} {format_seconds(seconds):>12} {'new':>8}")
+            continue
+        change = seconds / baseline - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<44} {format_seconds(baseline):>12} {format_seconds(seconds):>12} {change:+8.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the inference and persistence paths and compare with "
+                                                 "the stored baselines.")
+    parser.add_argument("--sizes", default=",".join(map(str, TABLE_SIZES)),
+                        help="Comma-separated RECORDS table sizes of the /patients cases.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (the best one is kept).")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="Slowdown over the baseline that fails the run (0.3 = 30%%).")
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    parser.add_argument("--save", action="store_true", help="Store this run as the new baselines.")
+    args = parser.parse_args()
+
+    timings = run_suite([int(size) for size in args.sizes.split(",")], args.repeat)
+
+    if args.save:
+        args.baselines.write_text(json.dumps({"machine": machine(), "results": timings}, indent=2) + "\n")
+        print(f"\nBaselines saved to {args.baselines}")
+        sys.exit(0)
+
+    if not args.baselines.exists():
+        print(f"\nNo baselines at {args.baselines}, run with --save to store them")
+        sys.exit(0)
+
+    baselines = json.loads(args.baselines.read_text())
+    if baselines.get("machine") != machine():
+        print(f"\nWarning: the baselines were taken on another machine ({baselines.get('machine')})")
+    regressions = compare(timings, baselines, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\nNo regression above {args.threshold:.0%}")
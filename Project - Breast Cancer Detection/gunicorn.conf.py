@@ -0,0 +1,51 @@
+# Gunicorn configuration for serving the OncoAI API in production
+#   gunicorn -c gunicorn.conf.py main:app
+import multiprocessing
+import os
+
+# Listening address
+bind = os.environ.get("ONCOAI_BIND", "0.0.0.0:5000")
+
+# Worker processes, each serving requests from a pool of threads
+workers = int(os.environ.get("ONCOAI_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("ONCOAI_THREADS", 4))
+worker_class = "gthread"
+
+# One database connection per thread
+os.environ.setdefault("ONCOAI_DB_POOL_SIZE", str(threads))
+
+# Import the app once in the master, workers share its pages copy-on-write. The model is part of them
+# with the default eager loading (also the Docker image's); with ONCOAI_MODEL_LOADING=background each
+# worker loads its own copy after the fork
+preload_app = True
+
+# Request handling
+timeout = int(os.environ.get("ONCOAI_TIMEOUT", 30))
+keepalive = 5
+
+# Logging
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("ONCOAI_LOG_LEVEL", "info")
+
+
+def on_starting(server):
+    """Create the tables and indexes once, before any worker is forked."""
+    from main import init_database
+    init_database()
+
+
+def post_fork(server, worker):
+    """Drop the connections inherited from the master, every worker opens its own, and watch the models."""
+    from main import app, db, helping_functions, write_queue, WRITE_BEHIND
+    with app.app_context():
+        db.engine.dispose(close=False)
+    helping_functions.registry.start()
+    if WRITE_BEHIND:
+        write_queue.start()
+
+
+def worker_exit(server, worker):
+    """Write the records still queued by the worker, spooling them if the database is unavailable."""
+    from main import write_queue
+    write_queue.stop()
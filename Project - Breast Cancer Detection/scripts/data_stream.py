@@ -1,5 +1,8 @@
 # Importing the required libraries
+import numpy as np
+import argparse
 import requests
+import asyncio
 import random
 import time
 
@@ -52,6 +55,12 @@ LAST_NAMES = [
 # -------------------------------------------------------------------------
 
 
+# Centroids as arrays in the same feature order, for vectorized generation
+FEATURE_NAMES = list(BENIGN_CENTROID)
+BENIGN_VECTOR = np.array([BENIGN_CENTROID[feature] for feature in FEATURE_NAMES])
+MALIGNANT_VECTOR = np.array([MALIGNANT_CENTROID[feature] for feature in FEATURE_NAMES])
+
+
 # 1-minute interval between data stream requests
 INTERVAL_SECONDS = 60
 
@@ -93,6 +102,26 @@ def generate_sample() -> dict:
     return features
 
 
+def generate_samples(n: int, rng: np.random.Generator = None) -> list:
+    """
+    Vectorized version of `generate_sample`: draw `n` samples at once with the same
+    centroid interpolation, mixing ratio range and 5% Gaussian noise.
+    """
+    rng = rng or np.random.default_rng()
+
+    # One mixing ratio per sample
+    t = rng.uniform(0.15, 0.95, size=(n, 1))
+
+    # Linear interpolation between centroids plus noise scaled by the feature range
+    interpolated = BENIGN_VECTOR * (1 - t) + MALIGNANT_VECTOR * t
+    noise = rng.normal(0.0, np.abs(MALIGNANT_VECTOR - BENIGN_VECTOR) * 0.05, size=(n, len(FEATURE_NAMES)))
+
+    # Ensure non-negative values
+    values = np.round(np.maximum(0.0, interpolated + noise), 6)
+
+    return [dict(zip(FEATURE_NAMES, row)) for row in values.tolist()]
+
+
 def generate_patient_info() -> dict:
     """Generate random patient demographics."""
     return {
@@ -101,8 +130,105 @@ def generate_patient_info() -> dict:
     }
 
 
-if __name__ == "__main__":
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+async def run_load(url: str, concurrency: int, rps: float, duration: float) -> dict:
+    """
+    Send /predict requests for `duration` seconds.
+
+    With a target `rps` (open loop), request i is dispatched as its own task at start + i / rps whatever the
+    server's speed, and at most `concurrency` requests are in flight (connection cap). Latencies are measured from
+    the scheduled time, so the time a request waits for a connection behind a saturated server is counted (no
+    coordinated omission). A request sent more than one interval after its slot counts as a missed slot.
+
+    Without one (closed loop), `concurrency` clients each send their next request as soon as the previous one
+    completes, and latencies are measured from the sending.
+
+    :return: Dictionary with the sent, failed, per-status and missed-slot counts, the offered rate (None in closed
+        loop), the elapsed seconds and the sorted latencies (ms).
+    """
+    import httpx
+
+    # Pre-generating a pool of payloads in one vectorized call
+    pool_size = max(1, min(10000, int((rps or 1000) * duration)))
+    payloads = generate_samples(pool_size)
+    for payload in payloads:
+        payload.update(generate_patient_info())
+
+    latencies, statuses = [], {}
+    missed = 0
+    connections = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def send(session: httpx.AsyncClient, i: int, scheduled: float):
+        nonlocal missed
+        async with connections:
+            if rps and time.perf_counter() - scheduled > 1 / rps:
+                missed += 1
+            try:
+                response = await session.post(url, json=payloads[i % pool_size])
+                status = response.status_code
+            except httpx.HTTPError as error:
+                status = type(error).__name__
+        statuses[status] = statuses.get(status, 0) + 1
+        if status == 200:
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as session:
+        if rps:
+            # One task per slot of the schedule, dispatched on time even if earlier requests are still pending
+            tasks = []
+            for i in range(int(duration * rps)):
+                scheduled = start + i / rps
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                tasks.append(asyncio.create_task(send(session, i, scheduled)))
+            await asyncio.gather(*tasks)
+        else:
+            counter = iter(range(10 ** 12))
 
+            async def client():
+                for i in counter:
+                    now = time.perf_counter()
+                    if now >= deadline:
+                        return
+                    await send(session, i, now)
+
+            await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    elapsed = time.perf_counter() - start
+    sent = sum(statuses.values())
+    return {
+        "sent": sent,
+        "failed": sent - statuses.get(200, 0),
+        "statuses": statuses,
+        "missed": missed,
+        "offered_rps": rps,
+        "elapsed": elapsed,
+        "latencies": sorted(latencies),
+    }
+
+
+def print_report(report: dict) -> None:
+    """Print the offered and achieved rates, error rate, missed slots and latency percentiles of a load run."""
+    sent, failed, latencies = report["sent"], report["failed"], report["latencies"]
+    print(f"Requests   : {sent} in {report['elapsed']:.1f}s (achieved {sent / report['elapsed']:.1f} req/s)")
+    if report["offered_rps"]:
+        print(f"Schedule   : offered {report['offered_rps']:.1f} req/s | missed slots {report['missed']} "
+              f"({report['missed'] / sent * 100 if sent else 0:.2f}%)")
+    print(f"Errors     : {failed} ({failed / sent * 100 if sent else 0:.2f}%) | statuses {report['statuses']}")
+    print(f"Latency    : p50 {percentile(latencies, 50):.1f} ms | p95 {percentile(latencies, 95):.1f} ms | "
+          f"p99 {percentile(latencies, 99):.1f} ms")
+
+
+def stream(url: str) -> None:
+    """Send one realistic sample every INTERVAL_SECONDS, forever."""
     while True:
         # Generate a realistic sample using centroid interpolation
         data = generate_sample()
@@ -112,7 +238,7 @@ if __name__ == "__main__":
 
         try:
             # Sending the data stream to the predict endpoint
-            response = requests.post('http://127.0.0.1:5000/predict', json=data)
+            response = requests.post(url, json=data)
             result = response.json()
             print(
                 f"[{time.strftime('%H:%M:%S')}] "
@@ -126,3 +252,18 @@ if __name__ == "__main__":
 
         # Wait before the next request
         time.sleep(INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulated data stream and load generator for the OncoAI API.")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/predict")
+    parser.add_argument("--load", action="store_true", help="Run a load test instead of the 60-second stream.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients (load mode).")
+    parser.add_argument("--rps", type=float, default=None, help="Target requests/sec, unbounded if omitted.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Load test duration in seconds.")
+    args = parser.parse_args()
+
+    if args.load:
+        print_report(asyncio.run(run_load(args.url, args.concurrency, args.rps, args.duration)))
+    else:
+        stream(args.url)
@@ -0,0 +1,302 @@
+# Import the required libraries
+from pathlib import Path
+import numpy as np
+import threading
+import math
+import csv
+import io
+
+# Percentile edges of each reference feature (1st to 99th), so the live values fall in 100 bins; the
+# PSI is computed on the deciles (groups of 10 bins) and the KS statistic on all of them
+REFERENCE_PERCENTILES = np.arange(1, 100)
+DECILE_GROUP = 10
+
+# Population Stability Index bands: below 0.1 stable, up to 0.25 moderate shift, significant above
+PSI_BANDS = ((0.1, "stable"), (0.25, "moderate"))
+
+# Proportion given to empty bins in the PSI logarithms
+PSI_EPSILON = 1e-4
+
+# Coefficient of the two-sample KS critical value at the 5% level
+KS_ALPHA_COEFFICIENT = 1.358
+
+# Reported quantiles of the live values
+QUANTILES = {"p05": 0.05, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p95": 0.95}
+
+
+# Quantile sketch of one feature
+class TDigest:
+    """
+    Merging t-digest: the values are kept as about `compression` / 2 weighted centroids, small at
+    the tails and larger around the median (arcsine scale function), so the quantiles stay accurate in
+    constant memory whatever the number of values.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    def merge(self, values: np.ndarray) -> None:
+        """Add a batch of values, merging them with the centroids in one sorted pass."""
+        if not len(values):
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, np.ones(len(values))])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        # Points whose left quantile falls in the same unit of the scale function form one centroid
+        left_quantiles = (np.cumsum(weights) - weights) / weights.sum()
+        scale = self.compression / (2 * math.pi) * np.arcsin(2 * left_quantiles - 1)
+        _, clusters = np.unique(np.floor(scale - scale[0]), return_inverse=True)
+        self.weights = np.bincount(clusters, weights)
+        self.means = np.bincount(clusters, weights * means) / self.weights
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by interpolating between the centroids (None when empty)."""
+        if not len(self.weights):
+            return None
+        total = self.weights.sum()
+        positions = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * total, np.concatenate([[0.0], positions, [total]]),
+                               np.concatenate([[self.min], self.means, [self.max]])))
+
+
+# Training distribution the live inputs are compared with
+class ReferenceDistribution:
+    """
+    Summary of a training dataset: per feature mean, standard deviation, percentile edges and the
+    proportion of the rows in each percentile bin (ties make them differ from 1%).
+    :param csv_path: Dataset with a header row, a 'diagnosis' column (1 = malignant) and the features.
+    :param features: Feature names, in the order of the live rows; features absent from the dataset
+        are monitored without a reference.
+    """
+
+    def __init__(self, csv_path: Path, features: list):
+        self.name = Path(csv_path).name
+        with open(csv_path, newline="") as csv_file:
+            reader = csv.reader(csv_file)
+            header = next(reader)
+            rows = np.array([[float(value) for value in row] for row in reader if row])
+        columns = {name: index for index, name in enumerate(header)}
+
+        self.count = len(rows)
+        self.malignant_rate = float(rows[:, columns["diagnosis"]].mean()) if "diagnosis" in columns else None
+        self.available = np.array([feature in columns for feature in features])
+        matrix = np.column_stack([rows[:, columns[feature]] if feature in columns else np.zeros(self.count)
+                                  for feature in features])
+
+        self.mean = matrix.mean(axis=0)
+        self.std = matrix.std(axis=0, ddof=1)
+        self.edges = np.percentile(matrix, REFERENCE_PERCENTILES, axis=0).T
+        self.proportions = bin_counts(self.edges, matrix) / self.count
+
+
+def bin_counts(edges: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Count the rows of an N x F matrix in the bins delimited by the F x E edges (F x E+1 counts)."""
+    n_bins = edges.shape[1] + 1
+    return np.stack([np.bincount(np.searchsorted(edges[j], matrix[:, j], side="right"), minlength=n_bins)
+                     for j in range(edges.shape[0])])
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    """PSI of each row of bin proportions, sum((actual - expected) * ln(actual / expected))."""
+    expected = np.maximum(expected, PSI_EPSILON)
+    actual = np.maximum(actual, PSI_EPSILON)
+    return ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+
+
+def psi_band(psi: float) -> str:
+    """Name the size of a population shift."""
+    for limit, band in PSI_BANDS:
+        if psi < limit:
+            return band
+    return "significant"
+
+
+# Streaming statistics of the served inputs against the training distribution
+class DriftMonitor:
+    """
+    Per feature statistics of every scored input, updated in O(1) memory: Welford mean and variance
+    (merged per batch with the Chan et al. formula), min and max, a t-digest of the quantiles, and the
+    counts of the reference percentile bins from which the PSI and the KS statistic against the
+    training data are derived.
+
+    Single rows are only copied into a buffer, merged `buffer_size` rows at a time (or when a report
+    is requested), so the request pays a row copy. The statistics cover the rows passed to it; `last_record_id`
+    lets a caller feeding it stored records by increasing id resume after the last one merged.
+    :param reference: The training distribution.
+    :param features: Feature names, in the order of the rows passed to update.
+    :param min_count: Inputs needed before a drift status is reported.
+    :param compression: Size parameter of the t-digests (about half as many centroids per feature).
+    :param buffer_size: Rows buffered between two merges.
+    """
+
+    def __init__(self, reference: ReferenceDistribution, features: list, min_count: int = 100,
+                 compression: int = 200, buffer_size: int = 256):
+        self.reference = reference
+        self.features = list(features)
+        self.min_count = min_count
+        self.last_record_id = 0
+        n_features = len(self.features)
+
+        self.count = 0
+        self.malignant = 0
+        self._mean = np.zeros(n_features)
+        self._m2 = np.zeros(n_features)
+        self._min = np.full(n_features, np.inf)
+        self._max = np.full(n_features, -np.inf)
+        self._bins = np.zeros((n_features, reference.edges.shape[1] + 1), dtype=np.int64)
+        self._digests = [TDigest(compression) for _ in self.features]
+        self._buffer = np.empty((buffer_size, n_features))
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    # --- Updates ------------------------------------------------------------
+    def update(self, values, malignant: bool = None) -> None:
+        """Add one input (its feature values in order) and optionally its predicted class."""
+        with self._lock:
+            self._buffer[self._buffered] = values
+            self._buffered += 1
+            if malignant:
+                self.malignant += 1
+            if self._buffered == len(self._buffer):
+                self._flush_buffer()
+
+    def update_many(self, matrix: np.ndarray, malignant=None) -> None:
+        """Add an N x F matrix of inputs and optionally their predicted classes (N booleans)."""
+        if not len(matrix):
+            return
+        matrix = np.asarray(matrix, dtype=float)
+        with self._lock:
+            self._merge(matrix)
+            if malignant is not None:
+                self.malignant += int(np.count_nonzero(malignant))
+
+    def _flush_buffer(self) -> None:
+        """Merge the buffered rows (called with the lock held)."""
+        if self._buffered:
+            self._merge(self._buffer[:self._buffered])
+            self._buffered = 0
+
+    def _merge(self, matrix: np.ndarray) -> None:
+        """Fold a batch of rows into every statistic (called with the lock held)."""
+        batch_count = len(matrix)
+        batch_mean = matrix.mean(axis=0)
+        batch_m2 = ((matrix - batch_mean) ** 2).sum(axis=0)
+
+        # Chan et al. combination of the running and the batch moments
+        total = self.count + batch_count
+        delta = batch_mean - self._mean
+        self._mean += delta * batch_count / total
+        self._m2 += batch_m2 + delta ** 2 * self.count * batch_count / total
+        self.count = total
+
+        np.minimum(self._min, matrix.min(axis=0), out=self._min)
+        np.maximum(self._max, matrix.max(axis=0), out=self._max)
+        self._bins += bin_counts(self.reference.edges, matrix)
+        for j, digest in enumerate(self._digests):
+            digest.merge(matrix[:, j])
+
+    # --- State --------------------------------------------------------------
+    def state(self) -> bytes:
+        """Serialize the merged statistics and `last_record_id` (an .npz archive of a few tens of KB)."""
+        with self._lock:
+            self._flush_buffer()
+            buffer = io.BytesIO()
+            np.savez(
+                buffer,
+                counters=np.array([self.last_record_id, self.count, self.malignant], dtype=np.int64),
+                mean=self._mean, m2=self._m2, min=self._min, max=self._max, bins=self._bins,
+                digest_sizes=np.array([len(digest.weights) for digest in self._digests]),
+                digest_means=np.concatenate([digest.means for digest in self._digests]),
+                digest_weights=np.concatenate([digest.weights for digest in self._digests]),
+                digest_bounds=np.array([[digest.min, digest.max] for digest in self._digests]),
+            )
+        return buffer.getvalue()
+
+    def load_state(self, data: bytes) -> None:
+        """Replace the statistics with a state serialized by `state` (same reference and features)."""
+        with np.load(io.BytesIO(data)) as archive:
+            arrays = {name: archive[name] for name in archive.files}
+        if arrays["bins"].shape != self._bins.shape:
+            raise ValueError("The drift state was saved for other features or reference bins.")
+        with self._lock:
+            self.last_record_id, self.count, self.malignant = (int(value) for value in arrays["counters"])
+            self._mean, self._m2 = arrays["mean"], arrays["m2"]
+            self._min, self._max, self._bins = arrays["min"], arrays["max"], arrays["bins"]
+            ends = np.cumsum(arrays["digest_sizes"])
+            for digest, end, size, (minimum, maximum) in zip(self._digests, ends, arrays["digest_sizes"],
+                                                             arrays["digest_bounds"]):
+                digest.means = arrays["digest_means"][end - size:end]
+                digest.weights = arrays["digest_weights"][end - size:end]
+                digest.min, digest.max = float(minimum), float(maximum)
+            self._buffered = 0
+
+    # --- Report -------------------------------------------------------------
+    def report(self) -> dict:
+        """Return the live statistics of each feature next to the reference ones, with PSI and KS."""
+        with self._lock:
+            self._flush_buffer()
+            count = self.count
+            mean, m2 = self._mean.copy(), self._m2.copy()
+            minimum, maximum = self._min.copy(), self._max.copy()
+            bins = self._bins.copy()
+            quantiles = [{name: digest.quantile(q) for name, q in QUANTILES.items()} for digest in self._digests]
+            malignant = self.malignant
+
+        reference = self.reference
+        std = np.sqrt(m2 / (count - 1)) if count > 1 else np.full(len(self.features), np.nan)
+        proportions = bins / count if count else np.zeros(bins.shape)
+        psi = population_stability_index(
+            reference.proportions.reshape(len(self.features), -1, DECILE_GROUP).sum(axis=2),
+            proportions.reshape(len(self.features), -1, DECILE_GROUP).sum(axis=2),
+        )
+        ks = np.abs(np.cumsum(proportions, axis=1) - np.cumsum(reference.proportions, axis=1)).max(axis=1)
+        ks_critical = (KS_ALPHA_COEFFICIENT * math.sqrt((count + reference.count) / (count * reference.count))
+                       if count else None)
+        enough = count >= self.min_count
+
+        features = {}
+        for j, feature in enumerate(self.features):
+            statistics = {
+                "mean": float(mean[j]) if count else None,
+                "std": float(std[j]) if count > 1 else None,
+                "min": float(minimum[j]) if count else None,
+                "max": float(maximum[j]) if count else None,
+                "quantiles": quantiles[j],
+                "reference": None,
+            }
+            if reference.available[j]:
+                statistics["reference"] = {"mean": float(reference.mean[j]), "std": float(reference.std[j])}
+                if count:
+                    statistics["psi"] = round(float(psi[j]), 6)
+                    statistics["ks"] = round(float(ks[j]), 6)
+                    statistics["status"] = psi_band(psi[j]) if enough else "insufficient_data"
+                    statistics["ks_drift"] = bool(ks[j] > ks_critical) if enough else None
+            features[feature] = statistics
+
+        # The most severe band over the features compared with the reference
+        bands = [statistics.get("status") for statistics in features.values() if statistics.get("status")]
+        status = "insufficient_data"
+        if enough and bands:
+            status = max(bands, key=["stable", "moderate", "significant"].index)
+
+        return {
+            "reference": reference.name,
+            "reference_count": reference.count,
+            "count": count,
+            "last_record_id": self.last_record_id,
+            "status": status,
+            "ks_critical": ks_critical,
+            "predictions": {
+                "malignant_rate": malignant / count if count else None,
+                "reference_malignant_rate": reference.malignant_rate,
+            },
+            "features": features,
+        }
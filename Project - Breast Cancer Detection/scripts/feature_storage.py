@@ -0,0 +1,106 @@
+# Import the required libraries
+from scripts.helping_functions import FEATURES
+import numpy as np
+import argparse
+import sqlite3
+import struct
+import time
+
+# Underscored column names of the 30 features, in model order
+FEATURE_COLUMNS = [feature.replace(" ", "_") for feature in FEATURES]
+
+# Supported encodings of the packed features, recognized by their length when decoding:
+# float64 (the default) keeps the submitted values exactly, float32 halves the blob but rounds them to ~7 significant
+# digits (12.46 is read back as 12.460000038146973), so it is only used when an operator opts in
+BLOB_DTYPES = {"float64": np.dtype("<f8"), "float32": np.dtype("<f4")}
+_STRUCTS = {
+    name: struct.Struct(f"<{len(FEATURE_COLUMNS)}{dtype.char}") for name, dtype in BLOB_DTYPES.items()
+}
+_STRUCTS_BY_SIZE = {codec.size: codec for codec in _STRUCTS.values()}
+
+
+# Encode and decode the packed features of a record
+def pack_features(values, dtype: str = "float64") -> bytes:
+    """
+    Pack the 30 feature values of one record into a little-endian blob.
+    :param values: The feature values, in model order.
+    :param dtype: 'float64' or 'float32'.
+    :return: The blob (240 or 120 bytes).
+    """
+    return _STRUCTS[dtype].pack(*values)
+
+
+def pack_feature_rows(matrix: np.ndarray, dtype: str = "float64") -> list:
+    """Pack every row of an N x 30 feature matrix, one blob per row."""
+    packed = np.ascontiguousarray(matrix, dtype=BLOB_DTYPES[dtype])
+    return [row.tobytes() for row in packed]
+
+
+def unpack_features(blob: bytes) -> tuple:
+    """Decode a blob written by pack_features, whatever its dtype, into the 30 feature values."""
+    return _STRUCTS_BY_SIZE[len(blob)].unpack(blob)
+
+
+# Move the features of an existing database between the 30 columns and the packed blob
+def migrate(database: str, to: str = "packed", dtype: str = "float64", batch_size: int = 5000,
+            vacuum: bool = False) -> int:
+    """
+    Convert the RECORDS rows in place, in batches of one transaction each, so the migration can be
+    interrupted and resumed. Packing clears the 30 columns, unpacking clears the blob.
+
+    :param database: Path of the SQLite database.
+    :param to: 'packed' (columns to blob) or 'columns' (blob to columns).
+    :param dtype: Encoding of the packed blobs.
+    :param batch_size: Number of rows converted per transaction.
+    :param vacuum: Rebuild the file afterwards to give the freed space back.
+    :return: The number of converted rows.
+    """
+    connection = sqlite3.connect(database, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    columns = ", ".join(f'"{column}"' for column in FEATURE_COLUMNS)
+
+    # The blob column of the databases created before it existed
+    existing = {row[1] for row in connection.execute('PRAGMA table_info("RECORDS")')}
+    if "features_blob" not in existing:
+        connection.execute('ALTER TABLE "RECORDS" ADD COLUMN "features_blob" BLOB')
+
+    if to == "packed":
+        select = (f'SELECT id, {columns} FROM "RECORDS" WHERE features_blob IS NULL '
+                  f'AND "{FEATURE_COLUMNS[0]}" IS NOT NULL AND id > ? ORDER BY id LIMIT ?')
+        cleared = ", ".join(f'"{column}" = NULL' for column in FEATURE_COLUMNS)
+        update = f'UPDATE "RECORDS" SET features_blob = ?, {cleared} WHERE id = ?'
+        convert = lambda row: (pack_features(row[1:], dtype), row[0])
+    else:
+        select = 'SELECT id, features_blob FROM "RECORDS" WHERE features_blob IS NOT NULL AND id > ? ORDER BY id LIMIT ?'
+        assigned = ", ".join(f'"{column}" = ?' for column in FEATURE_COLUMNS)
+        update = f'UPDATE "RECORDS" SET {assigned}, features_blob = NULL WHERE id = ?'
+        convert = lambda row: (*unpack_features(row[1]), row[0])
+
+    converted, last_id = 0, 0
+    while True:
+        rows = connection.execute(select, (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        with connection:
+            connection.executemany(update, map(convert, rows))
+        converted += len(rows)
+        last_id = rows[-1][0]
+
+    if vacuum:
+        connection.execute("VACUUM")
+    connection.close()
+    return converted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move the record features between the 30 columns and a packed blob.")
+    parser.add_argument("--database", default="main.db")
+    parser.add_argument("--to", choices=["packed", "columns"], default="packed")
+    parser.add_argument("--dtype", choices=list(BLOB_DTYPES), default="float64")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--vacuum", action="store_true", help="Reclaim the freed space once done.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = migrate(args.database, args.to, args.dtype, args.batch_size, args.vacuum)
+    print(f"Converted {count} records to {args.to} storage in {time.perf_counter() - start:.1f} s")
@@ -1,15 +1,34 @@
 # Import the required libraries
+from scripts.validation import FeatureSchema, FEATURE_RANGES
+from scripts.model_registry import ModelRegistry
+from collections import OrderedDict
 from pathlib import Path
 import numpy as np
-import random
-import string
-import joblib
+import threading
+import math
+import time
+import csv
+import os
+import io
 
-# Creating the path for the model
+# Creating the path for the models
 path = Path.cwd()
+MODELS_DIR = path / "models"
 
-# Loading the model
-model = joblib.load(f"{path}/models/main_model_v1.joblib")
+# Loading every model version, the active one serves the requests that do not pin a version (at import, or
+# in the background once the registry threads are started with ONCOAI_MODEL_LOADING=background)
+registry = ModelRegistry(
+    MODELS_DIR,
+    active_version=os.environ.get("ONCOAI_ACTIVE_MODEL"),
+    shadow_version=os.environ.get("ONCOAI_SHADOW_MODEL"),
+    poll_interval=float(os.environ.get("ONCOAI_MODEL_POLL_INTERVAL", 5)),
+    backend=os.environ.get("ONCOAI_MODEL_BACKEND", "auto"),
+    load=os.environ.get("ONCOAI_MODEL_LOADING", "eager") != "background",
+)
+
+# Prediction cache settings (a size of 0 disables the cache)
+PREDICTION_CACHE_SIZE = int(os.environ.get("ONCOAI_PREDICTION_CACHE_SIZE", 4096))
+PREDICTION_CACHE_TTL = float(os.environ.get("ONCOAI_PREDICTION_CACHE_TTL", 3600))
 
 # Defining the input features
 FEATURES = [
@@ -23,6 +42,10 @@ FEATURES = [
 ]
 
 
+# Compiling the validation schema once
+schema = FeatureSchema(FEATURES, FEATURE_RANGES)
+
+
 # Data Validation
 def validate_input(input_data: dict) -> bool:
     """
@@ -32,58 +55,294 @@ def validate_input(input_data: dict) -> bool:
     :return: True if the data is valid, False otherwise.
 
     """
+    return not schema.validate_record(input_data)
+
+
+# Data Validation with error reports
+def validation_errors(input_data: dict) -> list:
+    """
+    Validate the input data: every feature present, numeric, finite and within its physiologic range.
+
+    :param input_data: Dictionary containing data.
+    :return: List of {field, error} reports, empty if the data is valid.
+    """
+    return schema.validate_record(input_data)
+
+
+# Batch Data Validation
+def validate_batch_input(input_rows: list) -> tuple:
+    """
+    Validate a batch of input records column-wise before sending it to the predictive model.
+
+    :param input_rows: List of dictionaries, one per sample.
+    :return: Tuple (N x 30 feature matrix, list of {row, field, error} reports, empty if the whole batch is valid).
+    """
+    return schema.validate_batch(input_rows)
+
+
+# Parse a CSV upload into input records
+def parse_csv_rows(csv_text: str) -> list:
+    """
+    Parse a CSV export (one sample per row, header with the feature names) into input records.
+    :param csv_text: Raw CSV content.
+    :return: List of dictionaries, numeric cells converted to floats.
+    """
+    rows = []
+    for raw_row in csv.DictReader(io.StringIO(csv_text)):
+        row = {}
+        for key, value in raw_row.items():
+            if key is None:
+                continue
+            key = key.strip()
+            try:
+                row[key] = float(value) if key in FEATURES else value
+            except (TypeError, ValueError):
+                # Keep the raw value so that validation reports the row
+                row[key] = value
+        # Empty optional cells are treated as missing
+        if row.get("patient_age") not in (None, ""):
+            try:
+                row["patient_age"] = int(float(row["patient_age"]))
+            except ValueError:
+                row["patient_age"] = None
+        rows.append({key: value for key, value in row.items() if value != ""})
+
+    return rows
+
+
+# Preallocated per-thread input buffer for the single sample path
+_buffers = threading.local()
+
+
+def _sigmoid(z: float) -> float:
+    """Numerically stable logistic function."""
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    exp_z = math.exp(z)
+    return exp_z / (1.0 + exp_z)
+
+
+# Cache of prediction results
+class PredictionCache:
+    """
+    Thread-safe LRU cache of prediction results with a time-to-live, keyed on the model version and
+    the ordered feature values. The registry drops the whole cache whenever a model file changes.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        """Return a copy of the cached result for the key, or None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key: tuple, result: dict) -> None:
+        """Store a copy of the result, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
 
-    # Check if all required keys are present in the JSON data
-    if not all(key in input_data for key in FEATURES):
-        return False
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
 
-    # Check if the values are numeric (int or float) and not null
-    for key in FEATURES:
-        value = input_data[key]
-        if value is None:
-            return False
-        if not isinstance(value, (int, float)):
-            return False
+    def stats(self) -> dict:
+        """Return the cache counters."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+            }
 
-    # Return True if the data is valid
-    return True
+
+# Creating the prediction cache (None when disabled), invalidated on every model change
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL) if PREDICTION_CACHE_SIZE > 0 else None
+if prediction_cache is not None:
+    registry.add_listener(prediction_cache.clear)
 
 
 # Predict diagnosis and Confidence
-def predict_diagnosis(validated_data: dict) -> dict:
+def predict_diagnosis(validated_data: dict, use_compiled: bool = True, version: str = None) -> dict:
     """
-    Predict the diagnosis based on the input data.
+    Predict the diagnosis based on the input data, with a single pass through the model.
     :param validated_data: Dictionary containing validated data.
-    :return: Dictionary containing the predicted diagnosis and confidence score.
+    :param use_compiled: Score with the folded weights when available, instead of the sklearn pipeline
+        (always the case for models loaded from exported coefficients).
+    :param version: Model version to use, the active one by default (KeyError if unknown).
+    :return: Dictionary containing the predicted diagnosis, confidence score and model version.
     """
+    # Resolve the model once for the whole request
+    loaded_model = registry.get(version)
+
     # Extract feature values in the correct order (without mutating the input)
-    feature_values = [validated_data[key] for key in FEATURES]
+    feature_values = tuple(validated_data[key] for key in FEATURES)
+    cache_key = (loaded_model.version, feature_values)
+
+    # Return the cached result of identical measurements
+    if prediction_cache is not None:
+        cached_result = prediction_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+
+    # Fill the thread's input buffer
+    input_buffer = getattr(_buffers, "input", None)
+    if input_buffer is None:
+        input_buffer = _buffers.input = np.empty((1, len(FEATURES)))
+    input_buffer[0] = feature_values
 
-    # Reshape into a 2D array for sklearn (1 sample, 30 features)
-    input_array = np.array(feature_values).reshape(1, -1)
+    if loaded_model.compiled is not None and (use_compiled or loaded_model.pipeline is None):
+        # Dot product plus sigmoid gives the probability of the malignant class
+        weights, bias = loaded_model.compiled
+        malignant_probability = _sigmoid(float(np.dot(input_buffer[0], weights)) + bias)
+    else:
+        # Get the raw probability scores (Outputs: [[prob_benign, prob_malignant]])
+        malignant_probability = float(loaded_model.pipeline.predict_proba(input_buffer)[0][1])
 
-    # Get the hard prediction
-    prediction = model.predict(input_array)[0]
+    # Compare with the shadow model off the request path
+    if registry.shadow_running:
+        registry.submit_shadow(input_buffer.copy(), np.array([malignant_probability]), loaded_model.version)
 
-    # Get the raw probability scores (Outputs: [[prob_benign, prob_malignant]])
-    probabilities = model.predict_proba(input_array)[0]
+    # The hard prediction is derived from the probabilities
+    prediction = 1 if malignant_probability > 0.5 else 0
 
     # Confidence = probability of the predicted class (not always malignant)
-    confidence_score = probabilities[prediction] * 100
+    confidence_score = (malignant_probability if prediction == 1 else 1.0 - malignant_probability) * 100
 
     # Construct the dictionary with the prediction and confidence score
     prediction_result = {
         "diagnosis": "Malignant" if prediction == 1 else "Benign",
         "confidence": round(confidence_score, 2),
+        "model_version": loaded_model.version,
     }
 
+    # Cache the prediction result
+    if prediction_cache is not None:
+        prediction_cache.put(cache_key, prediction_result)
+
     # Return the prediction result
     return prediction_result
 
 
+# Predict diagnoses and Confidences for a batch
+def predict_diagnoses(validated_rows: list, use_compiled: bool = True, version: str = None,
+                      input_array: np.ndarray = None) -> list:
+    """
+    Predict the diagnoses of a whole batch with a single pass through the model.
+    :param validated_rows: List of dictionaries containing validated data.
+    :param use_compiled: Score with the folded weights when available, instead of the sklearn pipeline.
+    :param version: Model version to use, the active one by default (KeyError if unknown).
+    :param input_array: The N x 30 feature matrix already built by `validate_batch_input`, if available.
+    :return: List of dictionaries containing the predicted diagnosis, confidence score and model version.
+    """
+    # Resolve the model once for the whole batch
+    loaded_model = registry.get(version)
+
+    # Build the N x 30 feature matrix in the model's feature order
+    if input_array is None:
+        input_array = np.array([[row[key] for key in FEATURES] for row in validated_rows], dtype=float)
+
+    # One pass for the whole batch (Outputs: [prob_malignant, ...])
+    malignant_probabilities = loaded_model.malignant_probabilities(input_array, use_compiled)
+
+    # Compare with the shadow model off the request path
+    registry.submit_shadow(input_array, malignant_probabilities, loaded_model.version)
+
+    # The predicted class is the most probable one, and its probability is the confidence
+    predictions = malignant_probabilities > 0.5
+    confidence_scores = np.round(
+        np.where(predictions, malignant_probabilities, 1.0 - malignant_probabilities) * 100, 2
+    )
+
+    # Return one prediction result per row
+    return [
+        {
+            "diagnosis": "Malignant" if prediction else "Benign",
+            "confidence": float(confidence_score),
+            "model_version": loaded_model.version,
+        }
+        for prediction, confidence_score in zip(predictions, confidence_scores)
+    ]
+
+
+# Generator of time-ordered patient IDs
+class PatientIdGenerator:
+    """
+    Monotonic ULID-style patient IDs: a 48-bit millisecond timestamp followed by 80 random bits,
+    encoded as 26 Crockford base32 characters (e.g. '01JAB3XQ4M7KZ9T2W5R8YC6DNE').
+
+    IDs sort by creation time, and IDs generated within the same millisecond increment the random
+    part of the previous one, so a process never produces the same ID twice and the 2^80 random
+    space makes collisions between processes negligible whatever the size of the table.
+    """
+
+    ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the last ID (a forked child must not continue its parent's sequence)."""
+        self._last_ms = -1
+        self._last_random = 0
+
+    def __call__(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms > self._last_ms:
+                random_bits = int.from_bytes(os.urandom(10), "big")
+            else:
+                # Same millisecond (or clock moved back): increment the previous ID
+                ms, random_bits = self._last_ms, self._last_random + 1
+                if random_bits >= 1 << 80:
+                    ms, random_bits = ms + 1, 0
+            self._last_ms, self._last_random = ms, random_bits
+
+        value = (ms << 80) | random_bits
+        return "".join(self.ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+# Creating the patient ID generator, reset in forked workers
+_patient_id_generator = PatientIdGenerator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_patient_id_generator.reset)
+
+
 # Generate Patient ID
 def generate_patient_id() -> str:
-    """Generate a unique patient ID in the format '###-XX' (e.g. '882-XJ')."""
-    num = random.randint(100, 999)
-    letters = ''.join(random.choices(string.ascii_uppercase, k=2))
-    return f"{num}-{letters}"
+    """Generate a unique, time-ordered patient ID (26 characters, e.g. '01JAB3XQ4M7KZ9T2W5R8YC6DNE')."""
+    return _patient_id_generator()
+
+
+# Short form of a Patient ID
+def short_patient_id(patient_id: str) -> str:
+    """
+    Human-readable short form of a patient ID, for display only (e.g. 'R8YC-6DNE').
+    Legacy IDs ('882-XJ') and client-supplied IDs of 9 characters or less are returned unchanged.
+    """
+    if not patient_id or len(patient_id) <= 9:
+        return patient_id
+    return f"{patient_id[-8:-4]}-{patient_id[-4:]}"
@@ -0,0 +1,181 @@
+# Import the required libraries
+from contextlib import contextmanager
+from bisect import bisect_left
+import importlib.util
+import threading
+import time
+
+# Upper bounds of the latency buckets, in seconds (from 100 µs to 10 s)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+
+def _escape(value) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, bucket=None) -> str:
+    """Format a Prometheus label set, with the 'le' label of a histogram bucket if given."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if bucket is not None:
+        pairs.append(f'le="{bucket}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# Latency histogram of one metric, per label set
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus model, kept in process memory.
+
+    Each observation increments one bucket under a lock, the cumulative counts are only summed when
+    rendered, so recording costs a bisect and a few integer additions.
+    """
+
+    def __init__(self, name: str, description: str, label_names: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float) -> None:
+        """Record one value for the given label values."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per bucket counts (the last one is +Inf), then the sum of the values
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list:
+        """Return the Prometheus text lines of the histogram."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for label_values, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, label_values, bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, label_values)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, label_values)} {cumulative}")
+        return lines
+
+
+# Counter of events, per label set
+class Counter:
+    """Monotonic counter in the Prometheus model, kept in process memory."""
+
+    def __init__(self, name: str, description: str, label_names: tuple):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: tuple, amount: int = 1) -> None:
+        """Increment the counter of the given label values."""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        """Return the Prometheus text lines of the counter."""
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        lines += [f"{self.name}{_labels(self.label_names, labels)} {value}" for labels, value in values]
+        return lines
+
+
+# Timings of the stages of one request
+class StageTimer:
+    """Accumulates the duration of the named stages of a request, to be recorded once it is answered."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as the given stage (repeated stages add up)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started
+
+
+# Request metrics of the service
+class RequestMetrics:
+    """The request counters, request latencies and stage latencies of every route of a process."""
+
+    def __init__(self):
+        self.requests = Counter("oncoai_requests_total", "Requests answered, by route, method and status.",
+                                ("route", "method", "status"))
+        self.latency = Histogram("oncoai_request_duration_seconds", "Request handling time, by route and method.",
+                                 ("route", "method"))
+        self.stages = Histogram("oncoai_stage_duration_seconds", "Time spent in each stage of a route.",
+                                ("route", "stage"))
+
+    def record(self, route: str, method: str, status: int, timer: StageTimer) -> None:
+        """Record an answered request and the stages it went through."""
+        self.requests.inc((route, method, str(status)))
+        self.latency.observe((route, method), timer.elapsed())
+        for name, seconds in timer.stages.items():
+            self.stages.observe((route, name), seconds)
+
+    def render(self) -> list:
+        """Return the Prometheus text lines of all the request metrics."""
+        return self.requests.render() + self.latency.render() + self.stages.render()
+
+
+# Opt-in profiler of a single request
+class RequestProfiler:
+    """
+    Profile one request with pyinstrument (sampling, when installed) or cProfile (deterministic).
+    :param kind: 'pyinstrument', 'cprofile', or 'auto' for pyinstrument when available.
+    """
+
+    def __init__(self, kind: str = "auto"):
+        if kind == "auto":
+            kind = "pyinstrument" if importlib.util.find_spec("pyinstrument") else "cprofile"
+        self.kind = kind
+        # Deferred imports: the profilers are only loaded when a request asks for a profile
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+        else:
+            import cProfile
+            self._profiler = cProfile.Profile()
+
+    @property
+    def extension(self) -> str:
+        """File extension of the report."""
+        return "html" if self.kind == "pyinstrument" else "txt"
+
+    def start(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self) -> str:
+        """Stop profiling and return the report (HTML call tree, or the top cProfile entries)."""
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            return self._profiler.output_html()
+
+        import pstats
+        import io
+        self._profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(self._profiler, stream=output).sort_stats("cumulative").print_stats(50)
+        return output.getvalue()
@@ -0,0 +1,395 @@
+# Import the required libraries
+from pathlib import Path
+import numpy as np
+import threading
+import argparse
+import hashlib
+import logging
+import queue
+import time
+import re
+
+# Logger of the registry (model loads, swaps and failures)
+logger = logging.getLogger(__name__)
+
+# Model backends: the sklearn pipelines (*.joblib), their exported coefficients (*.npz, no sklearn import),
+# or the coefficients when they were exported from the current pipeline file and the pipeline otherwise
+MODEL_BACKENDS = ("auto", "numpy", "sklearn")
+
+
+# Fold the pipeline into a single linear scorer
+def compile_model(pipeline, tolerance: float = 1e-9):
+    """
+    Fold a fitted StandardScaler + LogisticRegression pipeline into one weight vector and bias.
+
+    Scaling then scoring, ((x - mean) / scale) . coef + intercept, is rewritten as x . weights + bias
+    with weights = coef / scale and bias = intercept - (mean / scale) . coef, so that scoring a sample
+    is a dot product followed by a sigmoid.
+
+    :param pipeline: The fitted sklearn pipeline.
+    :param tolerance: Maximum probability difference accepted against the sklearn path.
+    :return: Tuple (weights, bias), or None if the pipeline cannot be folded exactly.
+    """
+    # Only a scaler followed by a binary logistic regression can be folded
+    steps = getattr(pipeline, "steps", None)
+    if not steps or len(steps) != 2:
+        return None
+
+    scaler, classifier = steps[0][1], steps[1][1]
+    if type(scaler).__name__ != "StandardScaler" or type(classifier).__name__ != "LogisticRegression":
+        return None
+    if classifier.coef_.shape[0] != 1 or list(classifier.classes_) != [0, 1]:
+        return None
+
+    # Identity transformation for the disabled parts of the scaler
+    n_features = classifier.coef_.shape[1]
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+    # Fold the scaler into the coefficients
+    coef = classifier.coef_[0].astype(float)
+    weights = coef / scale
+    bias = float(classifier.intercept_[0] - np.dot(mean / scale, coef))
+
+    # Check the folded scorer against sklearn around the training distribution
+    probes = mean + scale * np.random.default_rng(0).normal(0, 2, size=(256, n_features))
+    expected = pipeline.predict_proba(probes)[:, 1]
+    folded = 1.0 / (1.0 + np.exp(-(probes @ weights + bias)))
+    if not np.allclose(folded, expected, rtol=0, atol=tolerance):
+        return None
+
+    return weights, bias
+
+
+# Digest of a model file, recorded in the coefficients exported from it
+def file_sha256(file_path: Path) -> str:
+    """Return the SHA-256 of a file's content."""
+    return hashlib.sha256(Path(file_path).read_bytes()).hexdigest()
+
+
+# Export the folded scorer of a pipeline file
+def export_coefficients(model_path: Path, output_path: Path = None) -> Path:
+    """
+    Fold a joblib pipeline and save its weights and bias as a NumPy archive, which serves the model
+    without importing scikit-learn.
+    :param model_path: The *.joblib pipeline file.
+    :param output_path: The archive to write, the model path with a .npz suffix by default.
+    :return: The path of the archive.
+    """
+    import joblib
+    model_path = Path(model_path)
+    output_path = Path(output_path) if output_path else model_path.with_suffix(".npz")
+    pipeline = joblib.load(model_path)
+    compiled = compile_model(pipeline)
+    if compiled is None:
+        raise ValueError(f"{model_path.name} is not a StandardScaler + LogisticRegression pipeline, its "
+                         "coefficients cannot be exported")
+
+    weights, bias = compiled
+    feature_names = getattr(pipeline, "feature_names_in_", None)
+    with open(output_path, "wb") as output_file:
+        np.savez(
+            output_file,
+            weights=weights,
+            bias=np.array(bias),
+            feature_names=np.array([] if feature_names is None else list(feature_names), dtype=str),
+            source_sha256=np.array(file_sha256(model_path)),
+        )
+    return output_path
+
+
+# Read the coefficients exported by export_coefficients
+def load_coefficients(archive_path: Path) -> tuple:
+    """
+    Read an exported scorer.
+    :return: Tuple ((weights, bias), SHA-256 of the pipeline file it was exported from).
+    """
+    with np.load(archive_path, allow_pickle=False) as archive:
+        return (archive["weights"], float(archive["bias"])), str(archive["source_sha256"])
+
+
+# A model version loaded in memory
+class LoadedModel:
+    """
+    A model loaded from disk: a sklearn pipeline, with its folded scorer when the pipeline allows it, or
+    only the folded scorer when loaded from exported coefficients (then `pipeline` is None).
+    """
+
+    def __init__(self, version: str, path: Path, pipeline, signature: tuple, compiled: tuple = None):
+        self.version = version
+        self.path = path
+        self.pipeline = pipeline
+        self.signature = signature
+        self.compiled = compile_model(pipeline) if pipeline is not None else compiled
+        self.loaded_at = time.time()
+
+    @property
+    def backend(self) -> str:
+        """'sklearn' when the pipeline is loaded, 'numpy' for exported coefficients."""
+        return "numpy" if self.pipeline is None else "sklearn"
+
+    def malignant_probabilities(self, input_array: np.ndarray, use_compiled: bool = True) -> np.ndarray:
+        """
+        Score an N x 30 matrix in one pass.
+        :param input_array: The feature matrix, in the model's feature order.
+        :param use_compiled: Use the folded weights when available, instead of the sklearn pipeline.
+        :return: The probability of the malignant class for each row.
+        """
+        if self.compiled is not None and (use_compiled or self.pipeline is None):
+            weights, bias = self.compiled
+            return 1.0 / (1.0 + np.exp(-(input_array @ weights + bias)))
+        return self.pipeline.predict_proba(input_array)[:, 1]
+
+
+def _version_key(version: str) -> tuple:
+    """Natural sort key, so that 'main_model_v10' comes after 'main_model_v9'."""
+    return tuple((0, int(token), "") if token.isdigit() else (1, 0, token)
+                 for token in re.split(r"(\d+)", version) if token)
+
+
+# Registry of the model versions found in the models directory
+class ModelRegistry:
+    """
+    Keeps every model of a directory loaded, one version per file stem: the `*.joblib` pipelines, or the
+    `*.npz` coefficients exported from them, depending on the backend.
+
+    The versions and the active one are held in a single immutable snapshot that the watcher thread
+    replaces atomically, so the request path reads it without taking any lock. The active version is
+    the pinned one when it exists, the latest version otherwise. A shadow version can be scored on
+    the served inputs in a background thread to compare a candidate model with the active one.
+    """
+
+    # Maximum number of batches waiting to be shadow scored before new ones are dropped
+    SHADOW_QUEUE_SIZE = 1000
+
+    def __init__(self, models_dir: Path, active_version: str = None, shadow_version: str = None,
+                 poll_interval: float = 5.0, backend: str = "auto", load: bool = True):
+        if backend not in MODEL_BACKENDS:
+            raise ValueError(f"Unknown model backend '{backend}'. Choose one of {', '.join(MODEL_BACKENDS)}.")
+        self.models_dir = Path(models_dir)
+        self.backend = backend
+        self.pinned_version = active_version
+        self.shadow_version = shadow_version
+        self.poll_interval = poll_interval
+
+        # (versions by name, active version name), replaced as a whole
+        self._snapshot = ({}, None)
+        self._listeners = []
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+        # Shadow scoring counters
+        self._shadow_queue = None
+        self.shadow_scored = 0
+        self.shadow_agreements = 0
+        self.shadow_dropped = 0
+        self.shadow_abs_delta = 0.0
+
+        # Loading the models synchronously at start, or with the first poll of the watcher thread
+        if load:
+            self.refresh()
+
+    # --- Snapshot -----------------------------------------------------------
+    @property
+    def versions(self) -> list:
+        """Names of the loaded versions, oldest first."""
+        return sorted(self._snapshot[0], key=_version_key)
+
+    @property
+    def ready(self) -> bool:
+        """Whether a model is loaded and can serve requests."""
+        return self._snapshot[1] is not None
+
+    @property
+    def active_version(self) -> str:
+        """Name of the version serving the requests that do not pin one."""
+        return self._snapshot[1]
+
+    def get(self, version: str = None) -> LoadedModel:
+        """
+        Return a loaded model, without locking.
+        :param version: The version to use, the active one by default.
+        :return: The loaded model; raises KeyError if the version is unknown.
+        """
+        models, active = self._snapshot
+        return models[version or active]
+
+    def add_listener(self, callback) -> None:
+        """Call `callback()` after every change of the loaded models."""
+        self._listeners.append(callback)
+
+    # --- Loading ------------------------------------------------------------
+    def refresh(self) -> bool:
+        """
+        Load the new and modified model files, drop the deleted ones, and swap the snapshot.
+        :return: True if the snapshot changed.
+        """
+        with self._refresh_lock:
+            current, current_active = self._snapshot
+            models = {}
+
+            for version, files in self._model_files().items():
+                signature = tuple(sorted(files.values()))
+
+                # Reuse the loaded model when its files did not change
+                previous = current.get(version)
+                if previous is not None and previous.signature == signature:
+                    models[version] = previous
+                    continue
+
+                try:
+                    models[version] = self._load(version, signature)
+                    logger.info("Loaded model %s from %s", version, models[version].path)
+                except Exception:
+                    # Possibly a partially written file, retried at the next poll
+                    logger.exception("Failed to load model %s, keeping the previous one", version)
+                    if previous is not None:
+                        models[version] = previous
+
+            if not models:
+                if current:
+                    logger.error("No model left in %s, keeping the loaded ones", self.models_dir)
+                    return False
+                raise FileNotFoundError(f"No model for the {self.backend} backend found in {self.models_dir}")
+
+            # The pinned version if available, the latest one otherwise
+            if self.pinned_version in models:
+                active = self.pinned_version
+            else:
+                active = max(models, key=_version_key)
+
+            changed = active != current_active or models.keys() != current.keys() or any(
+                models[version] is not current.get(version) for version in models
+            )
+            if not changed:
+                return False
+
+            # Atomic swap of the whole snapshot
+            self._snapshot = (models, active)
+            if current_active is not None and active != current_active:
+                logger.info("Active model switched from %s to %s", current_active, active)
+
+        for callback in self._listeners:
+            callback()
+        return True
+
+    def _model_files(self) -> dict:
+        """The model files the backend can serve, as {version: {suffix: (suffix, mtime_ns, size)}}."""
+        suffixes = {"auto": (".joblib", ".npz"), "numpy": (".npz",), "sklearn": (".joblib",)}[self.backend]
+        files = {}
+        for suffix in suffixes:
+            for model_path in sorted(self.models_dir.glob("*" + suffix)):
+                try:
+                    stat = model_path.stat()
+                except OSError:
+                    continue
+                files.setdefault(model_path.stem, {})[suffix] = (suffix, stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def _load(self, version: str, signature: tuple) -> LoadedModel:
+        """Load a version from its coefficients when the backend allows it, from its pipeline otherwise."""
+        suffixes = {suffix for suffix, _, _ in signature}
+        pipeline_path = self.models_dir / f"{version}.joblib"
+        archive_path = self.models_dir / f"{version}.npz"
+
+        if ".npz" in suffixes:
+            compiled, source_sha256 = load_coefficients(archive_path)
+            # Coefficients exported from an older pipeline file are ignored when the pipeline is available
+            if ".joblib" not in suffixes or source_sha256 == file_sha256(pipeline_path):
+                return LoadedModel(version, archive_path, None, signature, compiled)
+            logger.warning("%s was not exported from the current %s, loading the pipeline",
+                           archive_path.name, pipeline_path.name)
+
+        # Deferred import: joblib (and scikit-learn, when unpickling) are only needed by the pipelines
+        import joblib
+        return LoadedModel(version, pipeline_path, joblib.load(pipeline_path), signature)
+
+    # --- Background threads -------------------------------------------------
+    def start(self) -> None:
+        """Start the watcher (and the shadow scorer) threads of this process; call it after forking."""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._watch, name="model-watcher", daemon=True)]
+        if self.shadow_version:
+            self._shadow_queue = queue.Queue(maxsize=self.SHADOW_QUEUE_SIZE)
+            self._threads.append(threading.Thread(target=self._shadow_worker, name="model-shadow", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop the background threads."""
+        self._stop.set()
+        if self._shadow_queue is not None:
+            self._shadow_queue.put(None)
+
+    def _watch(self) -> None:
+        """Load the models now if they were not loaded at creation, then poll the models directory until stopped."""
+        wait = 0.0 if not self.ready else self.poll_interval
+        while not self._stop.wait(wait):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Model refresh failed")
+            wait = self.poll_interval
+
+    # --- Shadow scoring -----------------------------------------------------
+    @property
+    def shadow_running(self) -> bool:
+        """Whether the shadow scorer of this process accepts inputs."""
+        return self._shadow_queue is not None
+
+    def submit_shadow(self, input_array: np.ndarray, served_probabilities: np.ndarray, served_version: str) -> None:
+        """Queue served inputs for the shadow model, never blocking the request (dropped when full)."""
+        if self._shadow_queue is None or served_version == self.shadow_version:
+            return
+        try:
+            self._shadow_queue.put_nowait((input_array, served_probabilities))
+        except queue.Full:
+            self.shadow_dropped += 1
+
+    def _shadow_worker(self) -> None:
+        """Score the queued inputs with the shadow version and compare with the served predictions."""
+        while True:
+            item = self._shadow_queue.get()
+            if item is None:
+                return
+            input_array, served_probabilities = item
+            try:
+                candidate = self.get(self.shadow_version)
+            except KeyError:
+                continue
+            try:
+                probabilities = candidate.malignant_probabilities(input_array)
+            except Exception:
+                logger.exception("Shadow scoring with %s failed", self.shadow_version)
+                continue
+            self.shadow_scored += len(probabilities)
+            self.shadow_agreements += int(np.sum((probabilities > 0.5) == (served_probabilities > 0.5)))
+            self.shadow_abs_delta += float(np.sum(np.abs(probabilities - served_probabilities)))
+
+    def shadow_stats(self) -> dict:
+        """Return the agreement between the shadow and the served predictions."""
+        return {
+            "version": self.shadow_version,
+            "scored": self.shadow_scored,
+            "agreement": self.shadow_agreements / self.shadow_scored if self.shadow_scored else None,
+            "mean_abs_probability_delta": self.shadow_abs_delta / self.shadow_scored if self.shadow_scored else None,
+            "dropped": self.shadow_dropped,
+        }
+
+
+# Export the coefficients of the pipelines of a directory
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the folded coefficients of the *.joblib pipelines, so "
+                                                 "that they are served without scikit-learn.")
+    parser.add_argument("--models-dir", type=Path, default=Path("models"))
+    parser.add_argument("versions", nargs="*", help="Versions to export (file stems), all of them by default.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    pipeline_paths = [args.models_dir / f"{version}.joblib" for version in args.versions] or \
+        sorted(args.models_dir.glob("*.joblib"))
+    for pipeline_path in pipeline_paths:
+        logger.info("Exported %s to %s", pipeline_path.name, export_coefficients(pipeline_path).name)
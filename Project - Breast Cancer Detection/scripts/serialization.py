@@ -0,0 +1,164 @@
+# Import the required libraries
+from flask.json.provider import DefaultJSONProvider
+import importlib.util
+import logging
+import gzip
+
+# Logger of the serializer selection
+logger = logging.getLogger(__name__)
+
+# Response types worth compressing (the Parquet export is already compressed, and streamed)
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+# JSON provider backed by orjson
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with orjson straight to UTF-8 bytes.
+
+    The behavior follows the default provider (sorted keys, compact out of debug mode), except that
+    datetimes are encoded in ISO 8601 instead of HTTP dates and non-ASCII characters are not escaped.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+
+    def _options(self, indent: bool = False) -> int:
+        """orjson flags equivalent to the provider settings."""
+        options = self._orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= self._orjson.OPT_SORT_KEYS
+        if indent:
+            options |= self._orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize data as JSON to a string (the json.dumps keyword arguments are ignored)."""
+        return self._orjson.dumps(obj, default=self.default, option=self._options("indent" in kwargs)).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserialize data as JSON from a string or bytes."""
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Serialize the arguments as a JSON response, without going through a str."""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._orjson.dumps(obj, default=self.default, option=self._options(indent) | self._orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# JSON provider backed by msgspec
+class MsgspecProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with a msgspec encoder built once.
+
+    The behavior follows the default provider, except that datetimes are encoded in ISO 8601 and
+    the responses are always compact.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=self.default, order="sorted" if self.sort_keys else None)
+        self._decode = msgspec.json.decode
+
+    def dumps(self, obj, **kwargs) -> str:
+        """Serialize data as JSON to a string (the json.dumps keyword arguments are ignored)."""
+        return self._encoder.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        """Deserialize data as JSON from a string or bytes."""
+        return self._decode(s)
+
+    def response(self, *args, **kwargs):
+        """Serialize the arguments as a JSON response, without going through a str."""
+        body = self._encoder.encode(self._prepare_response_obj(args, kwargs)) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {
+    "orjson": OrjsonProvider,
+    "msgspec": MsgspecProvider,
+    "flask": DefaultJSONProvider,
+}
+
+
+# Select the JSON provider of the app
+def install_json_provider(app, name: str = "auto") -> str:
+    """
+    Replace the JSON provider used by jsonify, request.get_json and the error handlers.
+    :param app: The Flask app.
+    :param name: 'orjson', 'msgspec', 'flask', or 'auto' for the first of them that is installed.
+    :return: The name of the installed provider.
+    """
+    if name == "auto":
+        name = next(candidate for candidate in JSON_PROVIDERS
+                    if candidate == "flask" or importlib.util.find_spec(candidate) is not None)
+    elif name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON serializer '{name}'. Choose one of auto, {', '.join(JSON_PROVIDERS)}.")
+
+    app.json_provider_class = JSON_PROVIDERS[name]
+    app.json = app.json_provider_class(app)
+    logger.info("Serializing JSON with %s", name)
+    return name
+
+
+# Compress a response body for the client
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    """
+    Encode a body with gzip or brotli (requires the brotli package).
+    :param level: gzip level (1-9), or brotli quality (0-11).
+    """
+    if encoding == "br":
+        import brotli
+        return brotli.compress(body, quality=level)
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def negotiate_encoding(accept_encodings, encodings: list) -> str:
+    """Return the first of the enabled encodings accepted by the client, or None."""
+    for encoding in encodings:
+        if accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def compress_response(response, accept_encodings, encodings: list, min_size: int, levels: dict):
+    """
+    Compress a buffered response in place when the client accepts one of the enabled encodings.
+    :param response: The Flask response.
+    :param accept_encodings: The parsed Accept-Encoding header of the request.
+    :param encodings: Enabled encodings, by order of preference ('br', 'gzip').
+    :param min_size: Bodies smaller than this many bytes are sent as is.
+    :param levels: Compression level of each encoding.
+    :return: The response.
+    """
+    if (response.direct_passthrough or response.is_streamed or not 200 <= response.status_code < 300
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_MIMETYPES)):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    encoding = negotiate_encoding(accept_encodings, encodings)
+    if encoding is None or len(body) < min_size:
+        return response
+
+    response.set_data(compress(body, encoding, levels[encoding]))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def available_encodings(requested: list) -> list:
+    """Keep the requested encodings whose codec is installed (brotli is optional)."""
+    encodings = []
+    for encoding in requested:
+        if encoding == "br" and importlib.util.find_spec("brotli") is None:
+            logger.warning("Brotli compression requested but the brotli package is not installed")
+            continue
+        if encoding in ("br", "gzip"):
+            encodings.append(encoding)
+    return encodings
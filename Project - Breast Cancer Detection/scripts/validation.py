@@ -0,0 +1,179 @@
+# Import the required libraries
+from itertools import chain
+from operator import itemgetter
+import numpy as np
+import math
+
+# Physiologic ranges of the features: from 0 to about twice the maximum observed in the Wisconsin dataset,
+# wide enough for real samples while rejecting unit mistakes (e.g. an area in µm² instead of pixels)
+FEATURE_RANGES = {
+    "radius_mean": (0.0, 60.0), "texture_mean": (0.0, 80.0), "perimeter_mean": (0.0, 400.0),
+    "area_mean": (0.0, 5000.0), "smoothness_mean": (0.0, 0.35), "compactness_mean": (0.0, 0.7),
+    "concavity_mean": (0.0, 0.9), "concave points_mean": (0.0, 0.4), "symmetry_mean": (0.0, 0.6),
+    "fractal_dimension_mean": (0.0, 0.2), "radius_se": (0.0, 6.0), "texture_se": (0.0, 10.0),
+    "perimeter_se": (0.0, 45.0), "area_se": (0.0, 1100.0), "smoothness_se": (0.0, 0.07),
+    "compactness_se": (0.0, 0.3), "concavity_se": (0.0, 0.8), "concave points_se": (0.0, 0.11),
+    "symmetry_se": (0.0, 0.16), "fractal_dimension_se": (0.0, 0.06), "radius_worst": (0.0, 75.0),
+    "texture_worst": (0.0, 100.0), "perimeter_worst": (0.0, 500.0), "area_worst": (0.0, 8500.0),
+    "smoothness_worst": (0.0, 0.45), "compactness_worst": (0.0, 2.1), "concavity_worst": (0.0, 2.5),
+    "concave points_worst": (0.0, 0.6), "symmetry_worst": (0.0, 1.35), "fractal_dimension_worst": (0.0, 0.42),
+}
+
+# Error codes, in the order they are checked
+MISSING, NOT_NUMERIC, NOT_FINITE, OUT_OF_RANGE = 1, 2, 3, 4
+ERROR_NAMES = {MISSING: "missing", NOT_NUMERIC: "not_numeric", NOT_FINITE: "not_finite", OUT_OF_RANGE: "out_of_range"}
+
+# Exact types taking the fast path (bool is a subclass of int but not a measurement)
+NUMERIC_TYPES = {int, float}
+
+
+def _is_number(value) -> bool:
+    """Whether a value is a real number (int or float, bool excluded)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Compiled validation schema of the input features
+class FeatureSchema:
+    """
+    Validation schema compiled once from the ordered features and their ranges.
+
+    A record is valid when every feature is present, numeric, finite and within its physiologic range.
+    Single records are checked in one pass of plain Python, batches column by column with NumPy.
+    """
+
+    def __init__(self, features: list, ranges: dict):
+        self.features = list(features)
+        self.lower = np.array([ranges[feature][0] for feature in self.features])
+        self.upper = np.array([ranges[feature][1] for feature in self.features])
+        self._bounds = [(feature, *ranges[feature]) for feature in self.features]
+        self._ranges = {feature: tuple(ranges[feature]) for feature in self.features}
+        self._getter = itemgetter(*self.features)
+
+    def _error(self, field: str, code: int) -> dict:
+        """Build the report of one invalid field."""
+        error = {"field": field, "error": ERROR_NAMES[code]}
+        if code == OUT_OF_RANGE:
+            lower, upper = self._ranges[field]
+            error["message"] = f"must be between {lower} and {upper}"
+        return error
+
+    def validate_record(self, record) -> list:
+        """
+        Validate a single record.
+        :param record: Dictionary containing the data.
+        :return: List of {field, error} reports, empty if the record is valid.
+        """
+        if not isinstance(record, dict):
+            return [{"field": None, "error": "not_an_object"}]
+
+        errors = []
+        for feature, lower, upper in self._bounds:
+            value = record.get(feature)
+            if value is None:
+                errors.append({"field": feature, "error": "missing"})
+            elif type(value) not in NUMERIC_TYPES and not _is_number(value):
+                errors.append({"field": feature, "error": "not_numeric"})
+            else:
+                try:
+                    finite = math.isfinite(value)
+                except OverflowError:
+                    finite = False
+                if not finite:
+                    errors.append({"field": feature, "error": "not_finite"})
+                elif not lower <= value <= upper:
+                    errors.append({"field": feature, "error": "out_of_range",
+                                   "message": f"must be between {lower} and {upper}"})
+
+        return errors
+
+    def validate_batch(self, rows: list) -> tuple:
+        """
+        Validate a batch of records column-wise.
+        :param rows: List of dictionaries, one per sample.
+        :return: Tuple (N x 30 float matrix in feature order, list of {row, field, error} reports
+                 ordered by row then feature). Invalid cells of the matrix are NaN.
+        """
+        n_rows, n_features = len(rows), len(self.features)
+        matrix = self._numeric_matrix(rows)
+        if matrix is None:
+            matrix, codes, not_objects = self._classify_cells(rows)
+        else:
+            codes, not_objects = np.zeros((n_rows, n_features), dtype=np.int8), []
+
+        # Finiteness and ranges on the numeric cells, all columns at once
+        numeric = codes == 0
+        finite = np.isfinite(matrix)
+        codes[numeric & ~finite] = NOT_FINITE
+        with np.errstate(invalid="ignore"):
+            codes[numeric & finite & ((matrix < self.lower) | (matrix > self.upper))] = OUT_OF_RANGE
+
+        # The fields of the non-object rows are not reported one by one
+        codes[not_objects] = 0
+
+        # Row-major order of the invalid cells gives the reports sorted by row then feature
+        errors = [{"row": index, "field": None, "error": "not_an_object"} for index in not_objects]
+        for i, j in zip(*np.nonzero(codes)):
+            error = self._error(self.features[j], int(codes[i, j]))
+            errors.append({"row": int(i), **error})
+        if not_objects:
+            errors.sort(key=lambda error: error["row"])
+
+        return matrix, errors
+
+    def _numeric_matrix(self, rows: list):
+        """
+        Fast path: extract the matrix row by row when every row is an object holding plain numbers
+        for every feature. Return None as soon as a row does not, for the cell by cell classification.
+        """
+        try:
+            values = list(map(self._getter, rows))
+        except (KeyError, TypeError, AttributeError):
+            return None
+
+        if not set(map(type, chain.from_iterable(values))) <= NUMERIC_TYPES:
+            return None
+
+        try:
+            matrix = np.fromiter(chain.from_iterable(values), dtype=float, count=len(rows) * len(self.features))
+        except OverflowError:
+            return None
+        return matrix.reshape(len(rows), len(self.features))
+
+    def _classify_cells(self, rows: list) -> tuple:
+        """
+        Slow path: build the matrix column by column, classifying the missing and non-numeric cells.
+        :return: Tuple (matrix, error codes, indices of the rows that are not objects).
+        """
+        n_rows, n_features = len(rows), len(self.features)
+        matrix = np.full((n_rows, n_features), np.nan)
+        codes = np.zeros((n_rows, n_features), dtype=np.int8)
+
+        # Rows that are not objects are reported as a whole
+        not_objects = [index for index, row in enumerate(rows) if not isinstance(row, dict)]
+        if not_objects:
+            rows = [row if isinstance(row, dict) else {} for row in rows]
+
+        for j, feature in enumerate(self.features):
+            column = [row.get(feature) for row in rows]
+
+            # Fast path: the whole column holds plain numbers
+            if set(map(type, column)) <= NUMERIC_TYPES:
+                try:
+                    matrix[:, j] = column
+                    continue
+                except OverflowError:
+                    pass
+
+            # Slow path: classify each cell
+            for i, value in enumerate(column):
+                if value is None:
+                    codes[i, j] = MISSING
+                elif not _is_number(value):
+                    codes[i, j] = NOT_NUMERIC
+                else:
+                    try:
+                        matrix[i, j] = value
+                    except OverflowError:
+                        matrix[i, j] = np.inf
+
+        return matrix, codes, not_objects
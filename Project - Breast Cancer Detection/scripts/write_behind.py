@@ -0,0 +1,233 @@
+# Import the required libraries
+from datetime import datetime as dt
+from pathlib import Path
+import threading
+import logging
+import base64
+import queue
+import json
+import time
+import os
+
+# Logger of the background writer (failed batches, spooled records)
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the write queue stays full for longer than the producer is willing to wait."""
+
+
+# Spooled values that JSON does not represent: datetimes and bytes, tagged by a one-key object
+def _encode_value(value):
+    """Encode a datetime or bytes row value for the spool."""
+    if isinstance(value, dt):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"$bytes": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Cannot spool a value of type {type(value).__name__}")
+
+
+def _decode_value(obj: dict):
+    """Decode a tagged spool value, other objects are returned as they are."""
+    if len(obj) == 1:
+        if "$datetime" in obj:
+            return dt.fromisoformat(obj["$datetime"])
+        if "$bytes" in obj:
+            return base64.b64decode(obj["$bytes"])
+    return obj
+
+
+# Bounded queue of rows persisted by a background thread
+class WriteBehindQueue:
+    """
+    Hands rows over to a background writer so that the request does not wait on the database.
+
+    The writer takes up to `batch_size` rows at a time, or what arrived within `flush_interval` seconds
+    of the first one, and writes them with one call of `write_batch(rows)`. A failed batch is retried
+    row by row so that one bad row (e.g. a duplicate key) only loses itself. When the queue is full,
+    producers wait up to `put_timeout` seconds for room, then get QueueFull (backpressure).
+
+    On stop, the queue is drained and written; rows that still cannot be written are saved to the
+    spool directory as JSON lines, and written back by `replay()` at the next start. The spool only
+    covers a graceful stop: the rows queued in a process that is killed (SIGKILL, out of memory) are lost.
+
+    :param write_batch: Callable persisting a list of rows in one transaction.
+    :param max_size: Capacity of the queue, in rows.
+    :param batch_size: Maximum number of rows per write.
+    :param flush_interval: Maximum seconds a row waits for its batch to fill.
+    :param put_timeout: Seconds a producer waits for room in a full queue.
+    :param spool_dir: Directory of the rows left over at shutdown.
+    """
+
+    def __init__(self, write_batch, max_size: int = 10000, batch_size: int = 500, flush_interval: float = 0.05,
+                 put_timeout: float = 1.0, spool_dir: Path = None):
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        self._queue = queue.Queue(maxsize=max_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters exported by /metrics
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+
+    # --- Producer side ------------------------------------------------------
+    @property
+    def running(self) -> bool:
+        """Whether the writer thread of this process accepts rows."""
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    @property
+    def depth(self) -> int:
+        """Number of rows waiting to be written."""
+        return self._queue.qsize()
+
+    def put(self, row) -> None:
+        """Queue a row, waiting for room up to put_timeout seconds; raises QueueFull past it."""
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            self.rejected += 1
+            raise QueueFull(f"Write queue full ({self._queue.maxsize} rows)") from None
+        self.enqueued += 1
+
+    # --- Writer side --------------------------------------------------------
+    def start(self) -> None:
+        """Start the writer thread of this process; call it after forking."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop accepting rows, write the queued ones, and spool whatever could not be written."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+        # Rows left behind by a writer that did not finish in time
+        leftover = self._drain(self._queue.qsize())
+        if leftover:
+            self._spool(leftover)
+
+    def _drain(self, limit: int) -> list:
+        """Take up to `limit` rows without waiting."""
+        rows = []
+        while len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _next_batch(self) -> list:
+        """Wait for a first row, then collect more until the batch is full or the flush interval elapsed."""
+        try:
+            rows = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return rows + self._drain(self.batch_size - len(rows))
+
+    def _run(self) -> None:
+        """Write batches until stopped, then flush the rest of the queue."""
+        while not self._stop.is_set():
+            rows = self._next_batch()
+            if rows:
+                self._write(rows)
+
+        # Final flush on shutdown
+        while True:
+            rows = self._drain(self.batch_size)
+            if not rows:
+                break
+            self._write(rows, spool_failures=True)
+
+    def _write(self, rows: list, spool_failures: bool = False) -> None:
+        """Write a batch, falling back to one row at a time if the batch fails."""
+        try:
+            self.write_batch(rows)
+            self.written += len(rows)
+            self.batches += 1
+            return
+        except Exception:
+            logger.exception("Write-behind batch of %d rows failed, retrying row by row", len(rows))
+
+        unwritten = []
+        for row in rows:
+            try:
+                self.write_batch([row])
+                self.written += 1
+            except Exception:
+                logger.exception("Write-behind row dropped")
+                unwritten.append(row)
+        self.batches += 1
+
+        # At shutdown the rows that could not be written are kept for the next start, otherwise they
+        # are rejected by the database itself (e.g. a duplicate patient ID) and would fail again
+        if spool_failures and unwritten:
+            self._spool(unwritten)
+        else:
+            self.failed += len(unwritten)
+
+    # --- Spool --------------------------------------------------------------
+    def _spool(self, rows: list) -> None:
+        """Persist rows that could not be written to a file of this process."""
+        if self.spool_dir is None:
+            self.failed += len(rows)
+            logger.error("%d queued rows lost at shutdown (no spool directory)", len(rows))
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        spool_path = self.spool_dir / f"write_behind.{os.getpid()}.{time.time_ns()}.jsonl"
+        with open(spool_path, "w", encoding="utf-8") as spool_file:
+            for row in rows:
+                spool_file.write(json.dumps(row, default=_encode_value) + "\n")
+            spool_file.flush()
+            os.fsync(spool_file.fileno())
+        logger.warning("Spooled %d unwritten rows to %s", len(rows), spool_path)
+
+    def replay(self) -> int:
+        """
+        Write back the rows spooled at a previous shutdown, deleting each file once written.
+        :return: The number of rows read back from the spool.
+        """
+        if self.spool_dir is None or not self.spool_dir.exists():
+            return 0
+        replayed = 0
+        for spool_path in sorted(self.spool_dir.glob("write_behind.*.jsonl")):
+            with open(spool_path, encoding="utf-8") as spool_file:
+                rows = [json.loads(line, object_hook=_decode_value) for line in spool_file if line.strip()]
+            # Rows the database rejects (e.g. a duplicate key) are logged and counted as failed
+            self._write(rows)
+            spool_path.unlink()
+            replayed += len(rows)
+            logger.info("Replayed %d spooled rows from %s", len(rows), spool_path)
+        return replayed
+
+    def stats(self) -> dict:
+        """Return the queue counters."""
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+        }
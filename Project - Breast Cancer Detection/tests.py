@@ -0,0 +1,735 @@
+# Importing the modules of the API and the libraries the tests need
+from scripts.model_registry import ModelRegistry, LoadedModel, compile_model
+from scripts.write_behind import WriteBehindQueue, QueueFull
+from scripts.drift import DriftMonitor, ReferenceDistribution
+from scripts.helping_functions import PatientIdGenerator
+from scripts.data_stream import generate_samples
+from datetime import datetime as dt
+from pathlib import Path
+import numpy as np
+import threading
+import importlib
+import tempfile
+import shutil
+import pytest
+import sys
+import json
+import time
+import csv
+import io
+import os
+
+# Exported coefficients of the trained model, copied into each test's models directory
+MODEL_ARCHIVE = Path(__file__).parent / "models" / "main_model_v1.npz"
+MODEL_PIPELINE = Path(__file__).parent / "models" / "main_model_v1.joblib"
+
+
+@pytest.fixture(scope="session")
+def main():
+    """
+    Import the app on a scratch database and spool directory, set before its import
+    :return: the main module
+    """
+    test_dir = Path(tempfile.mkdtemp())
+    os.environ["ONCOAI_DATABASE_URI"] = f"sqlite:///{test_dir / 'test.db'}"
+    os.environ["ONCOAI_WRITE_SPOOL_DIR"] = str(test_dir / "spool")
+    main = importlib.import_module("main")
+    main.init_database()
+    yield main
+    shutil.rmtree(test_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def client(main):
+    """
+    Empty the tables and forget the drift statistics before each test
+    :return: a test client of the app
+    """
+    with main.app.app_context():
+        main.db.session.query(main.Feedback).delete()
+        main.db.session.query(main.Record).delete()
+        main.db.session.query(main.DriftState).delete()
+        main.db.session.commit()
+    main.drift_monitor = None
+    return main.app.test_client()
+
+
+def walk_pages(client, url):
+    """
+    Follow the keyset cursors of a paginated route until its last page
+    :param client: a test client of the app
+    :param url: the route with its query string, without the cursor
+    :return: the list of pages, each a list of items
+    """
+    pages, cursor = [], None
+    while True:
+        page = client.get(url + (f"&cursor={cursor}" if cursor else "")).get_json()
+        pages.append(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def samples(n, seed=0):
+    """
+    Draw valid patient samples from the data stream centroids
+    :param n: the number of samples
+    :param seed: the seed of the random generator
+    :return: a list of feature dictionaries
+    """
+    return generate_samples(n, np.random.default_rng(seed))
+
+
+# Defining a class TestWriteBehindQueue
+class TestWriteBehindQueue:
+
+    def test_flush(self):
+        # Every queued row is written, in order, by batches of at most batch_size rows
+        batches = []
+        write_queue = WriteBehindQueue(batches.append, batch_size=3, flush_interval=0.01)
+        write_queue.start()
+        for i in range(10):
+            write_queue.put({"id": i})
+        write_queue.stop()
+
+        assert [row["id"] for batch in batches for row in batch] == list(range(10))
+        assert all(len(batch) <= 3 for batch in batches)
+        assert write_queue.written == 10 and write_queue.failed == 0 and write_queue.depth == 0
+
+    def test_failed_batch_retried_row_by_row(self):
+        # A row the database rejects only loses itself
+        written = []
+
+        def write_batch(rows):
+            if any(row["id"] == 2 for row in rows):
+                raise ValueError("duplicate key")
+            written.extend(rows)
+
+        write_queue = WriteBehindQueue(write_batch, batch_size=5, flush_interval=0.05)
+        for i in range(5):
+            write_queue.put({"id": i})
+        write_queue.start()
+        write_queue.stop()
+
+        assert [row["id"] for row in written] == [0, 1, 3, 4]
+        assert write_queue.written == 4 and write_queue.failed == 1
+
+    def test_backpressure(self):
+        # A full queue makes the producer wait put_timeout seconds, then raises QueueFull
+        write_queue = WriteBehindQueue(lambda rows: None, max_size=2, put_timeout=0.01)
+        write_queue.put({"id": 0})
+        write_queue.put({"id": 1})
+        with pytest.raises(QueueFull):
+            write_queue.put({"id": 2})
+        assert write_queue.rejected == 1 and write_queue.depth == 2
+
+    def test_spool_and_replay(self, tmp_path):
+        # The writer is stuck on a first row while three more are queued: stopping spools those three
+        release = threading.Event()
+        first_written = []
+
+        def stuck_write(rows):
+            release.wait(5)
+            first_written.extend(rows)
+
+        rows = [{"id": i, "created_at": dt(2026, 10, 18, 12, 0, i), "features_blob": bytes([i, 255])}
+                for i in range(4)]
+        write_queue = WriteBehindQueue(stuck_write, batch_size=1, flush_interval=0.01, spool_dir=tmp_path)
+        write_queue.start()
+        write_queue.put(rows[0])
+        while write_queue.depth:
+            pass
+        for row in rows[1:]:
+            write_queue.put(row)
+        write_queue.stop(timeout=0.05)
+        release.set()
+
+        spooled = list(tmp_path.glob("write_behind.*.jsonl"))
+        assert len(spooled) == 1
+
+        # The next start writes the spooled rows back, with their datetimes and bytes, and deletes the file
+        replayed = []
+        assert WriteBehindQueue(replayed.extend, spool_dir=tmp_path).replay() == 3
+        assert replayed == rows[1:]
+        assert not list(tmp_path.iterdir())
+
+
+# Defining a class TestDriftMonitor
+class TestDriftMonitor:
+
+    def setup_method(self):
+        """
+        This method draws a reference dataset and live inputs shifted from it
+        :return: None
+        """
+        rng = np.random.default_rng(0)
+        self.features = ["radius_mean", "texture_mean"]
+        self.reference_rows = np.column_stack([rng.normal(14, 3, 2000), rng.normal(19, 4, 2000)])
+        self.live_rows = np.column_stack([rng.normal(15, 3, 1500), rng.normal(19, 5, 1500)])
+        self.diagnoses = rng.random(2000) < 0.4
+
+    def reference(self, tmp_path):
+        """
+        This method writes the reference dataset as a CSV file
+        :return: The reference distribution
+        """
+        csv_path = tmp_path / "reference.csv"
+        np.savetxt(csv_path, np.column_stack([self.diagnoses, self.reference_rows]), delimiter=",",
+                   header=",".join(["diagnosis"] + self.features), comments="")
+        return ReferenceDistribution(csv_path, self.features)
+
+    def test_welford_against_numpy(self, tmp_path):
+        # Rows fed one at a time (buffered) and as batches give numpy's mean, sample std, min and max
+        monitor = DriftMonitor(self.reference(tmp_path), self.features, buffer_size=64)
+        for row in self.live_rows[:300]:
+            monitor.update(row)
+        monitor.update_many(self.live_rows[300:1000])
+        monitor.update_many(self.live_rows[1000:])
+        report = monitor.report()
+
+        assert report["count"] == len(self.live_rows)
+        for j, feature in enumerate(self.features):
+            statistics = report["features"][feature]
+            assert statistics["mean"] == pytest.approx(self.live_rows[:, j].mean(), rel=1e-12)
+            assert statistics["std"] == pytest.approx(self.live_rows[:, j].std(ddof=1), rel=1e-12)
+            assert statistics["min"] == self.live_rows[:, j].min()
+            assert statistics["max"] == self.live_rows[:, j].max()
+
+    def test_psi_against_numpy(self, tmp_path):
+        # The PSI over the reference deciles, recomputed with numpy histograms
+        monitor = DriftMonitor(self.reference(tmp_path), self.features, min_count=100)
+        monitor.update_many(self.live_rows)
+        report = monitor.report()
+
+        for j, feature in enumerate(self.features):
+            deciles = np.percentile(self.reference_rows[:, j], np.arange(10, 100, 10))
+            bins = np.concatenate([[-np.inf], deciles, [np.inf]])
+            expected = np.histogram(self.reference_rows[:, j], bins)[0] / len(self.reference_rows)
+            actual = np.histogram(self.live_rows[:, j], bins)[0] / len(self.live_rows)
+            expected, actual = np.maximum(expected, 1e-4), np.maximum(actual, 1e-4)
+            psi = ((actual - expected) * np.log(actual / expected)).sum()
+            assert report["features"][feature]["psi"] == pytest.approx(psi, abs=1e-6)
+
+        # Unchanged inputs are stable
+        unchanged = DriftMonitor(self.reference(tmp_path), self.features, min_count=100)
+        unchanged.update_many(self.reference_rows)
+        assert unchanged.report()["status"] == "stable"
+
+    def test_state_round_trip(self, tmp_path):
+        # A monitor restored from a saved state reports the same statistics and goes on merging from it
+        reference = self.reference(tmp_path)
+        monitor = DriftMonitor(reference, self.features, buffer_size=64)
+        for row in self.live_rows[:100]:
+            monitor.update(row)
+        monitor.update_many(self.live_rows[100:1000], self.diagnoses[100:1000])
+        monitor.last_record_id = 1000
+
+        restored = DriftMonitor(reference, self.features, buffer_size=64)
+        restored.load_state(monitor.state())
+        assert restored.report() == monitor.report()
+
+        monitor.update_many(self.live_rows[1000:])
+        restored.update_many(self.live_rows[1000:])
+        assert restored.report() == monitor.report()
+
+        # A state of other features is refused
+        other = DriftMonitor(self.reference(tmp_path), self.features[:1])
+        with pytest.raises(ValueError):
+            other.load_state(monitor.state())
+
+
+# Defining a class TestModelRegistry
+class TestModelRegistry:
+
+    def setup_method(self):
+        """
+        This method counts the snapshot changes notified to the listeners
+        :return: None
+        """
+        self.changes = 0
+
+    def on_change(self):
+        self.changes += 1
+
+    def test_snapshot_swap(self, tmp_path):
+        shutil.copy(MODEL_ARCHIVE, tmp_path / "main_model_v1.npz")
+        registry = ModelRegistry(tmp_path, backend="numpy")
+        registry.add_listener(self.on_change)
+        served = registry.get()
+        assert registry.active_version == "main_model_v1" and isinstance(served, LoadedModel)
+
+        # Nothing changed on disk: the snapshot is kept
+        assert not registry.refresh() and self.changes == 0
+
+        # A new version becomes the active one, the unchanged one is reused, not reloaded
+        shutil.copy(MODEL_ARCHIVE, tmp_path / "main_model_v2.npz")
+        assert registry.refresh() and self.changes == 1
+        assert registry.active_version == "main_model_v2"
+        assert registry.versions == ["main_model_v1", "main_model_v2"]
+        assert registry.get("main_model_v1") is served
+
+        # A request holding the previous model still scores with it
+        inputs = np.ones((2, len(served.compiled[0])))
+        assert served.malignant_probabilities(inputs).shape == (2,)
+
+        # Deleting the file of the active version falls back to the remaining one
+        (tmp_path / "main_model_v2.npz").unlink()
+        assert registry.refresh() and registry.active_version == "main_model_v1"
+        with pytest.raises(KeyError):
+            registry.get("main_model_v2")
+
+    def test_pinned_version(self, tmp_path):
+        for version in ("main_model_v1", "main_model_v2"):
+            shutil.copy(MODEL_ARCHIVE, tmp_path / f"{version}.npz")
+        assert ModelRegistry(tmp_path, active_version="main_model_v1", backend="numpy").active_version == "main_model_v1"
+        assert ModelRegistry(tmp_path, active_version="main_model_v9", backend="numpy").active_version == "main_model_v2"
+
+    def test_readers_during_swaps(self, tmp_path):
+        # Requests reading the snapshot while the watcher swaps it always get a complete model
+        shutil.copy(MODEL_ARCHIVE, tmp_path / "main_model_v1.npz")
+        registry = ModelRegistry(tmp_path, backend="numpy")
+        stop, errors = threading.Event(), []
+
+        def read():
+            while not stop.is_set():
+                try:
+                    model = registry.get()
+                    assert model.version == registry.get(model.version).version
+                except Exception as error:
+                    errors.append(error)
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for i in range(2, 12):
+            shutil.copy(MODEL_ARCHIVE, tmp_path / f"main_model_v{i}.npz")
+            registry.refresh()
+        stop.set()
+        for reader in readers:
+            reader.join()
+
+        assert not errors and registry.active_version == "main_model_v11"
+
+
+# Defining a class TestFeatureStorage
+class TestFeatureStorage:
+
+    @pytest.mark.parametrize("storage", ["columns", "packed"])
+    def test_values_round_trip(self, main, client, monkeypatch, storage):
+        # A stored record returns exactly the submitted values, whatever the default storage layout
+        monkeypatch.setattr(main, "FEATURE_STORAGE", storage)
+        sample = dict(samples(1)[0], radius_mean=12.46, smoothness_mean=0.1186)
+        patient_id = client.post("/predict", json=sample).get_json()["patient_id"]
+
+        stored = client.get(f"/patients/{patient_id}").get_json()
+        exported = json.loads(client.get("/patients/export?format=ndjson").get_data(as_text=True))
+        for feature, column in zip(main.FEATURES, main.FEATURE_COLUMNS):
+            assert stored[column] == sample[feature]
+            assert exported[column] == sample[feature]
+
+
+# Defining a class TestPredictBatch
+class TestPredictBatch:
+
+    def test_same_results_as_predict(self, client):
+        # Scoring a batch gives each sample the diagnosis and confidence of its own /predict call
+        batch = samples(20, seed=1)
+        response = client.post("/predict/batch", json=batch)
+        assert response.status_code == 200
+        results = response.get_json()["results"]
+        assert len(results) == len(batch)
+
+        for sample, result in zip(batch, results):
+            single = client.post("/predict", json=sample).get_json()
+            for key in ("diagnosis", "confidence", "model_version"):
+                assert result[key] == single[key]
+        assert len({result["record_id"] for result in results}) == len(batch)
+
+    def test_batch_too_large(self, main, client, monkeypatch):
+        # A batch above MAX_BATCH_SIZE is refused with 413, before anything is stored
+        monkeypatch.setattr(main, "MAX_BATCH_SIZE", 3)
+        assert client.post("/predict/batch", json=samples(4)).status_code == 413
+        assert client.post("/predict/batch", json=samples(3)).status_code == 200
+        assert len(client.get("/patients").get_json()) == 3
+
+
+# Defining a class TestCompiledModel (the warnings of unpickling the pipeline with another sklearn version ignored)
+@pytest.mark.filterwarnings("ignore::UserWarning")
+class TestCompiledModel:
+
+    def test_probabilities_match_sklearn(self, main):
+        # The scaler folded into the logistic coefficients scores like the sklearn pipeline
+        import joblib
+        pipeline = joblib.load(MODEL_PIPELINE)
+        weights, bias = compile_model(pipeline)
+        matrix = np.array([[sample[feature] for feature in main.FEATURES] for sample in samples(500, seed=2)])
+
+        expected = pipeline.predict_proba(matrix)[:, 1]
+        compiled = 1.0 / (1.0 + np.exp(-(matrix @ weights + bias)))
+        assert np.allclose(compiled, expected, rtol=0, atol=1e-12)
+
+    def test_unfoldable_pipeline(self):
+        # Anything but a StandardScaler followed by a binary LogisticRegression keeps the sklearn path
+        import joblib
+        from sklearn.pipeline import Pipeline
+        classifier = joblib.load(MODEL_PIPELINE).steps[-1][1]
+        assert compile_model(Pipeline([("classifier", classifier)])) is None
+
+
+# Defining a class TestPatientsPagination
+class TestPatientsPagination:
+
+    def test_keyset_pages(self, client):
+        # The pages cover every record once, newest first, the id breaking the ties of a batch's timestamps
+        client.post("/predict/batch", json=samples(15, seed=3))
+        client.post("/predict/batch", json=samples(10, seed=4))
+        everything = client.get("/patients?fields=id,created_at").get_json()
+
+        pages = walk_pages(client, "/patients?limit=7&fields=id,created_at")
+        assert [len(page) for page in pages] == [7, 7, 7, 4]
+        assert [item["id"] for page in pages for item in page] == [item["id"] for item in everything]
+        keys = [(item["created_at"], item["id"]) for item in everything]
+        assert keys == sorted(keys, reverse=True)
+
+    def test_new_records_do_not_shift_pages(self, client):
+        # A record stored while a client pages through is not returned again, nor are the next pages shifted
+        client.post("/predict/batch", json=samples(6, seed=5))
+        first = client.get("/patients?limit=3&fields=id").get_json()
+        client.post("/predict", json=samples(1, seed=6)[0])
+        second = client.get(f"/patients?limit=3&fields=id&cursor={first['next_cursor']}").get_json()
+
+        ids = [item["id"] for item in first["items"] + second["items"]]
+        assert ids == sorted(ids, reverse=True) and len(set(ids)) == 6
+
+    def test_projection(self, client):
+        # Only the requested fields are serialized, 'features' standing for the 30 features
+        client.post("/predict", json=samples(1)[0])
+        item = client.get("/patients?limit=1&fields=diagnosis").get_json()["items"][0]
+        assert set(item) == {"diagnosis"}
+        item = client.get("/patients?limit=1&fields=id,features").get_json()["items"][0]
+        assert len(item) == 31
+
+    @pytest.mark.parametrize("query", ["limit=0", "limit=1001", "cursor=not-a-cursor", "fields=unknown"])
+    def test_bad_parameters(self, client, query):
+        assert client.get(f"/patients?{query}").status_code == 400
+
+
+
+# Defining a class TestReviewQueues
+class TestReviewQueues:
+
+    @pytest.fixture
+    def reviewed(self, client):
+        # 12 records: 3 confirmed, 4 flagged and 5 still pending
+        response = client.post("/predict/batch", json=samples(12, seed=7)).get_json()
+        ids = [result["record_id"] for result in response["results"]]
+        for record_id in ids[:3]:
+            client.post(f"/confirm/{record_id}", json={"is_confirmed": True})
+        for record_id in ids[3:7]:
+            client.post(f"/confirm/{record_id}", json={"is_confirmed": False})
+        return {"pending": set(ids[7:]), "flagged": set(ids[3:7])}
+
+    @pytest.mark.parametrize("queue", ["pending", "flagged"])
+    @pytest.mark.parametrize("order", ["oldest", "newest", "least_confident", "most_confident"])
+    def test_keyset_pages(self, client, reviewed, queue, order):
+        # Every order pages through exactly the records of the queue, sorted on its key then the id
+        pages = walk_pages(client, f"/review/{queue}?order={order}&limit=2&fields=id,created_at,prediction_confidence")
+        items = [item for page in pages for item in page]
+        assert all(len(page) == 2 for page in pages[:-1])
+        assert {item["id"] for item in items} == reviewed[queue] and len(items) == len(reviewed[queue])
+
+        column = "created_at" if order in ("oldest", "newest") else "prediction_confidence"
+        keys = [(item[column], item["id"]) for item in items]
+        assert keys == sorted(keys, reverse=order in ("newest", "most_confident"))
+
+    @pytest.mark.parametrize("query", ["order=random", "limit=0", "cursor=not-a-cursor", "fields=unknown"])
+    def test_bad_parameters(self, client, query):
+        assert client.get(f"/review/pending?{query}").status_code == 400
+
+
+# Defining a class TestExport
+class TestExport:
+    FIELDS = "id,created_at,patient_id,diagnosis,is_confirmed,radius_mean"
+
+    def test_ndjson_and_csv_match_patients(self, client):
+        # Both formats stream every record newest first, with the values and ISO 8601 timestamps of /patients
+        client.post("/predict/batch", json=samples(30, seed=8))
+        patients = client.get(f"/patients?fields={self.FIELDS}").get_json()
+
+        response = client.get(f"/patients/export?fields={self.FIELDS}")
+        assert response.mimetype == "application/x-ndjson"
+        ndjson = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        assert ndjson == [{field: item[field] for field in self.FIELDS.split(",")} for item in patients]
+
+        response = client.get(f"/patients/export?format=csv&fields={self.FIELDS}")
+        assert response.mimetype == "text/csv"
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert list(rows[0]) == self.FIELDS.split(",")
+        assert [row["created_at"] for row in rows] == [item["created_at"] for item in ndjson]
+        assert all(dt.fromisoformat(row["created_at"]).isoformat() == row["created_at"] for row in rows)
+        assert [(int(row["id"]), row["patient_id"], float(row["radius_mean"])) for row in rows] == [
+            (item["id"], item["patient_id"], item["radius_mean"]) for item in ndjson
+        ]
+
+    def test_empty_table(self, client):
+        # The CSV export is the header alone, the NDJSON export is empty
+        response = client.get("/patients/export?format=csv&fields=id,diagnosis")
+        assert response.get_data(as_text=True).strip() == "id,diagnosis"
+        assert client.get("/patients/export").get_data(as_text=True) == ""
+
+    def test_unknown_format(self, client):
+        assert client.get("/patients/export?format=xlsx").status_code == 400
+
+
+
+# Defining a class TestReviewBulk
+class TestReviewBulk:
+
+    def test_per_item_results(self, client, main):
+        # Valid operations are applied together, the malformed and unknown ones reported at their index
+        response = client.post("/predict/batch", json=samples(3, seed=9)).get_json()
+        ids = [result["record_id"] for result in response["results"]]
+        operations = [
+            {"record_id": ids[0], "is_confirmed": True},
+            {"record_id": ids[1], "is_confirmed": False, "feedback_body": "  Margins unclear.  "},
+            {"record_id": 999999, "is_confirmed": True},
+            {"record_id": str(ids[2]), "is_confirmed": True},
+            {"record_id": ids[2], "is_confirmed": "yes"},
+            {"record_id": ids[2], "is_confirmed": False, "feedback_body": " "},
+            "not an object",
+        ]
+        body = client.post("/review/bulk", json=operations).get_json()
+
+        assert (body["count"], body["applied"], body["failed"]) == (7, 2, 5)
+        assert [result["index"] for result in body["results"]] == list(range(7))
+        assert [result["status"] for result in body["results"]] == ["confirmed", "flagged"] + ["error"] * 5
+        assert body["results"][1]["feedback_body"] == "Margins unclear."
+        assert body["results"][2]["error"] == "Record with id 999999 not found."
+        assert all(result["error"] for result in body["results"][3:])
+
+        # The statuses and the feedback are stored, the record of the malformed operations left untouched
+        with main.app.app_context():
+            statuses = [main.db.session.get(main.Record, record_id).is_confirmed for record_id in ids]
+            feedbacks = [(f.record_id, f.feedback_body) for f in main.Feedback.query.all()]
+        assert statuses == [True, False, None]
+        assert feedbacks == [(ids[1], "Margins unclear.")]
+
+    def test_last_operation_wins(self, client):
+        # Several operations on one record: each has its result, the last one sets the status
+        record_id = client.post("/predict", json=samples(1)[0]).get_json()["record_id"]
+        body = client.post("/review/bulk", json=[
+            {"record_id": record_id, "is_confirmed": True},
+            {"record_id": record_id, "is_confirmed": False},
+        ]).get_json()
+        assert body["applied"] == 2
+        assert client.get("/review/flagged?fields=id").get_json()["items"] == [{"id": record_id}]
+
+    @pytest.mark.parametrize("payload", [[], {"record_id": 1, "is_confirmed": True}])
+    def test_bad_batch(self, client, payload):
+        assert client.post("/review/bulk", json=payload).status_code == 400
+
+    def test_batch_too_large(self, client, main, monkeypatch):
+        monkeypatch.setattr(main, "MAX_REVIEW_BATCH", 2)
+        operations = [{"record_id": 1, "is_confirmed": True}] * 3
+        assert client.post("/review/bulk", json=operations).status_code == 400
+
+
+# Defining a class TestValidationErrors
+class TestValidationErrors:
+
+    @staticmethod
+    def invalid_sample(seed=0) -> dict:
+        """
+        A sample with a missing, a non-numeric and an out-of-range feature
+        :return: the sample
+        """
+        sample = samples(1, seed)[0]
+        del sample["radius_mean"]
+        sample["texture_mean"] = "abc"
+        sample["area_mean"] = -5.0
+        return sample
+
+    EXPECTED = [
+        {"field": "radius_mean", "error": "missing"},
+        {"field": "texture_mean", "error": "not_numeric"},
+        {"field": "area_mean", "error": "out_of_range", "message": "must be between 0.0 and 5000.0"},
+    ]
+
+    def test_predict(self, client):
+        # Every failing field is reported, and nothing is stored
+        response = client.post("/predict", json=self.invalid_sample())
+        assert response.status_code == 400
+        assert response.get_json()["errors"] == self.EXPECTED
+        assert client.get("/patients").get_json() == []
+
+    @pytest.mark.parametrize("payload", [42, [1, 2], "text"])
+    def test_predict_not_an_object(self, client, payload):
+        response = client.post("/predict", json=payload)
+        assert response.status_code == 400
+        assert response.get_json()["errors"] == [{"field": None, "error": "not_an_object"}]
+
+    def test_predict_batch(self, client):
+        # The failing rows are reported by index, the valid rows of the batch are not stored either
+        rows = samples(3, seed=10)
+        rows[1] = self.invalid_sample()
+        body = client.post("/predict/batch", json=rows)
+        assert body.status_code == 400
+        body = body.get_json()
+        assert (body["invalid_rows"], body["error_count"]) == (1, 3)
+        assert body["errors"] == [{"row": 1, **error} for error in self.EXPECTED]
+        assert client.get("/patients").get_json() == []
+
+    def test_predict_batch_truncated(self, client, main, monkeypatch):
+        # The counts cover every error, the list only the first MAX_REPORTED_ERRORS
+        monkeypatch.setattr(main, "MAX_REPORTED_ERRORS", 4)
+        body = client.post("/predict/batch", json=[self.invalid_sample(seed) for seed in range(3)]).get_json()
+        assert (body["invalid_rows"], body["error_count"], len(body["errors"])) == (3, 9, 4)
+
+
+# Defining a class TestPatientIdGenerator
+class TestPatientIdGenerator:
+
+    def setup_method(self):
+        """
+        Create a fresh generator for each test
+        :return: None
+        """
+        self.generator = PatientIdGenerator()
+
+    def test_format_and_timestamp(self):
+        # 26 Crockford base32 characters, the first 10 encoding the current millisecond
+        before = time.time_ns() // 1_000_000
+        patient_id = self.generator()
+        after = time.time_ns() // 1_000_000
+        assert len(patient_id) == 26 and set(patient_id) <= set(PatientIdGenerator.ALPHABET)
+        ms = 0
+        for character in patient_id[:10]:
+            ms = ms * 32 + PatientIdGenerator.ALPHABET.index(character)
+        assert before <= ms <= after
+
+    def test_monotonic(self):
+        # Many IDs within the same milliseconds still sort in creation order
+        ids = [self.generator() for _ in range(20000)]
+        assert ids == sorted(ids) and len(set(ids)) == len(ids)
+
+    def test_clock_moved_back(self, monkeypatch):
+        # A clock stepping backwards continues the previous sequence instead of going back with it
+        first = self.generator()
+        monkeypatch.setattr(time, "time_ns", lambda: 0)
+        assert first < self.generator() < self.generator()
+
+    def test_random_part_overflow(self, monkeypatch):
+        # The random part exhausted within a millisecond carries into the next millisecond
+        monkeypatch.setattr(time, "time_ns", lambda: 1_000_000_000)
+        self.generator._last_ms, self.generator._last_random = 1000, (1 << 80) - 1
+        patient_id = self.generator()
+        assert self.generator._last_ms == 1001 and patient_id.endswith("0" * 16)
+
+    def test_unique_across_threads(self):
+        # Threads sharing the generator never receive the same ID, and each sees increasing IDs
+        results = [[] for _ in range(8)]
+
+        def generate(ids):
+            ids.extend(self.generator() for _ in range(5000))
+
+        threads = [threading.Thread(target=generate, args=(ids,)) for ids in results]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert all(ids == sorted(ids) for ids in results)
+        assert len({patient_id for ids in results for patient_id in ids}) == 8 * 5000
+
+
+# Defining a class TestDriftRoute
+class TestDriftRoute:
+
+    def test_report_and_saved_state(self, client, main):
+        # The report covers the stored records, whose statistics are saved for the other processes
+        response = client.post("/predict/batch", json=samples(150)).get_json()
+        ids = [result["record_id"] for result in response["results"]]
+        report = client.get("/monitoring/drift").get_json()
+        assert (report["count"], report["last_record_id"], report["scope"]) == (150, max(ids), "stored_records")
+        assert report["status"] != "insufficient_data"
+        with main.app.app_context():
+            assert main.db.session.get(main.DriftState, 1).last_record_id == max(ids)
+
+    def test_restart_resumes_from_saved_state(self, client, main):
+        # A new process loads the reference on first use and reads only the records stored after the saved state
+        client.post("/predict/batch", json=samples(120, seed=1))
+        before = client.get("/monitoring/drift").get_json()
+
+        # Deleting the merged records (but the last, so that the ids go on) shows they are not read again
+        main.drift_monitor = None
+        with main.app.app_context():
+            main.db.session.query(main.Record).filter(main.Record.id < before["last_record_id"]).delete()
+            main.db.session.commit()
+        client.post("/predict/batch", json=samples(5, seed=2))
+        assert main.drift_monitor is None
+
+        after = client.get("/monitoring/drift").get_json()
+        assert (after["count"], after["last_record_id"]) == (125, before["last_record_id"] + 5)
+
+    def test_init_database_catches_up(self, client, main):
+        # Startup merges the stored records, the first report has nothing left to read
+        client.post("/predict/batch", json=samples(40, seed=3))
+        main.init_database()
+        with main.app.app_context():
+            assert main.db.session.get(main.DriftState, 1).last_record_id == main.drift_monitor.last_record_id
+        assert client.get("/monitoring/drift").get_json()["count"] == 40
+
+
+# Defining a class TestProfiling
+class TestProfiling:
+
+    @pytest.fixture
+    def profiling(self, main, monkeypatch, tmp_path):
+        # Profiling enabled, the reports written to a scratch directory
+        monkeypatch.setattr(main, "PROFILING_ENABLED", True)
+        monkeypatch.setattr(main, "PROFILES_DIR", tmp_path)
+        return tmp_path
+
+    def test_report(self, client, profiling):
+        response = client.get("/health", headers={"X-Profile": "cprofile"})
+        assert (profiling / response.headers["X-Profile-Report"]).read_text()
+        assert sys.getprofile() is None
+
+    def test_unhandled_exception(self, client, main, profiling, monkeypatch):
+        # A view raising past the error handlers still has its profiler stopped and its report written
+        def failing_view():
+            raise RuntimeError("boom")
+
+        monkeypatch.setitem(main.app.view_functions, "health", failing_view)
+        monkeypatch.setitem(main.app.config, "PROPAGATE_EXCEPTIONS", True)
+        with pytest.raises(RuntimeError):
+            client.get("/health", headers={"X-Profile": "cprofile"})
+        assert sys.getprofile() is None
+        assert [path.name.endswith("-health.txt") for path in profiling.iterdir()] == [True]
+
+
+# Defining a class TestWriteBehindPredict
+class TestWriteBehindPredict:
+
+    def test_queued_record(self, client, main):
+        # The queued record has no id yet: the response identifies it by its patient ID only
+        main.write_queue.start()
+        try:
+            body = client.post("/predict", json=samples(1)[0]).get_json()
+        finally:
+            main.write_queue.stop()
+        assert "record_id" not in body
+        assert body["diagnosis"] in ("Benign", "Malignant")
+
+        # Once written, the patient ID gives the record and its id
+        record = client.get(f"/patients/{body['patient_id']}").get_json()
+        assert record["id"] and record["patient_id"] == body["patient_id"]
+
+    def test_client_patient_id_written_synchronously(self, client, main):
+        # A client-supplied patient ID is committed before the response, which carries the record id
+        main.write_queue.start()
+        try:
+            body = client.post("/predict", json={**samples(1)[0], "patient_id": "882-XJ"}).get_json()
+        finally:
+            main.write_queue.stop()
+        assert client.get("/patients/882-XJ").get_json()["id"] == body["record_id"]
+
@@ -0,0 +1,106 @@
+# Importing the required libraries
+from sqlalchemy import create_engine, Column, Integer, Float, DateTime
+from ingestion import IngestionQueue, configure_sqlite
+from sqlalchemy.orm import DeclarativeBase, Session
+from datetime import datetime as dt
+import threading
+import tempfile
+import random
+import time
+import os
+
+# Readings written per path (the commit per reading is much slower, it gets fewer), and request threads
+N_READINGS_PER_COMMIT = 2000
+N_READINGS_QUEUED = 100000
+N_THREADS = 4
+
+
+# The RECORDS table of main.py, without importing the app (and mlflow)
+class Base(DeclarativeBase):
+    pass
+
+
+class Storage(Base):
+    __tablename__ = 'RECORDS'
+    id = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, index=True)
+    sound = Column(Integer)
+    temperature = Column(Integer)
+    humidity = Column(Integer)
+    score = Column(Float)
+
+
+def generate_readings(count):
+    """
+    Generate scored readings within the normal ranges
+    :param count: the number of readings
+    :return: a list of ([sound, temperature, humidity], score)
+    """
+    return [([random.randint(60, 85), random.randint(68, 86), random.randint(40, 60)], random.uniform(1, 10))
+            for _ in range(count)]
+
+
+def commit_per_reading(engine, readings):
+    """
+    Store the readings the way store_data did, one ORM object and one commit per reading
+    :return: the elapsed seconds
+    """
+    start = time.perf_counter()
+    with Session(engine) as session:
+        for (sound, temperature, humidity), score in readings:
+            session.add(Storage(timestamp=dt.utcnow(), sound=sound, temperature=temperature, humidity=humidity,
+                                score=round(score, 2)))
+            session.commit()
+    return time.perf_counter() - start
+
+
+def queued(engine, readings):
+    """
+    Store the readings through the ingestion queue, put one at a time by concurrent request threads
+    :return: the elapsed seconds until every reading is committed
+    """
+    queue = IngestionQueue(engine, Storage.__table__)
+    queue.start()
+
+    def request_thread(chunk):
+        for measurements, score in chunk:
+            queue.put([measurements], [score])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=request_thread, args=(readings[index::N_THREADS],))
+               for index in range(N_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    queue.stop()
+    return time.perf_counter() - start
+
+
+def count_rows(engine):
+    """Count the rows of the RECORDS table."""
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT COUNT(*) FROM RECORDS").scalar()
+
+
+# Paths compared: (label, WAL and NORMAL synchronous, store function, number of readings)
+PATHS = [
+    ("commit per reading", False, commit_per_reading, N_READINGS_PER_COMMIT),
+    ("commit per reading, WAL", True, commit_per_reading, N_READINGS_PER_COMMIT),
+    ("ingestion queue, WAL", True, queued, N_READINGS_QUEUED),
+]
+
+
+if __name__ == "__main__":
+    print(f"{'Path':<26} {'readings':>9} {'seconds':>8} {'readings/s':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (label, tuned, store, count) in enumerate(PATHS):
+            engine = create_engine(f"sqlite:///{os.path.join(directory, f'ingestion_{index}.db')}")
+            if tuned:
+                configure_sqlite(engine)
+            Base.metadata.create_all(engine)
+
+            seconds = store(engine, generate_readings(count))
+            assert count_rows(engine) == count
+            engine.dispose()
+            print(f"{label:<26} {count:9d} {seconds:8.2f} {count / seconds:11.0f}")
@@ -0,0 +1,97 @@
+# Importing the required libraries
+from rollups import WINDOWS, MAX_POINTS, update_rollups, fetch_window, lttb
+from sqlalchemy import create_engine, Column, Integer, Float
+from benchmarks.bench_ingestion import Base, Storage
+from datetime import datetime as dt, timedelta
+from ingestion import configure_sqlite
+import numpy as np
+import pandas as pd
+import argparse
+import tempfile
+import sqlite3
+import time
+import os
+
+# Timed fetches per window (the best one is kept)
+N_REPEATS = 3
+
+
+# The ROLLUPS table of main.py
+class Rollup(Base):
+    __tablename__ = 'ROLLUPS'
+    resolution = Column(Integer, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    count = Column(Integer)
+    score_sum = Column(Float)
+    score_min = Column(Float)
+    score_max = Column(Float)
+
+
+def fill(engine, days, end):
+    """
+    Store one reading per second over the days before end, a day per transaction with its rollups
+    :return: the number of readings and the elapsed seconds
+    """
+    rng = np.random.default_rng(0)
+    start_time = time.perf_counter()
+    count = 0
+    for day in range(days, 0, -1):
+        first = end - timedelta(days=day)
+        scores = np.round(5.5 + 2 * np.sin(np.arange(86400) / 86400 * 2 * np.pi) + rng.normal(0, 0.5, 86400), 2)
+        rows = [{"timestamp": first + timedelta(seconds=second), "sound": 70, "temperature": 76, "humidity": 50,
+                 "score": score} for second, score in enumerate(scores.tolist())]
+        with engine.begin() as connection:
+            connection.execute(Storage.__table__.insert(), rows)
+            update_rollups(Rollup.__table__, connection, rows)
+        count += len(rows)
+    return count, time.perf_counter() - start_time
+
+
+def raw_month(connection, end):
+    """
+    Fetch a month of readings without the rollups, then downsample it
+    :return: pandas dataframe of at most MAX_POINTS rows
+    """
+    query = "SELECT timestamp, score FROM Records WHERE timestamp >= ? ORDER BY timestamp"
+    df = pd.read_sql(query, connection, params=((end - WINDOWS["month"][0]).isoformat(sep=" "),))
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+    selected = lttb(df["timestamp"].to_numpy(dtype="int64") / 1e9, df["score"].to_numpy(), MAX_POINTS)
+    return df.iloc[selected]
+
+
+def best_time(function):
+    """
+    Time a function
+    :return: the best elapsed seconds and the last result
+    """
+    timings = []
+    for _ in range(N_REPEATS):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the dashboard windows on readings stored every second.")
+    parser.add_argument("--days", type=int, default=30, help="Days of readings stored.")
+    args = parser.parse_args()
+
+    end = dt(2024, 4, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "windows.db")
+        engine = create_engine(f"sqlite:///{path}")
+        configure_sqlite(engine)
+        Base.metadata.create_all(engine)
+
+        count, seconds = fill(engine, args.days, end)
+        print(f"Stored {count} readings with their rollups in {seconds:.1f} s ({count / seconds:.0f} readings/s)\n")
+
+        print(f"{'Window':<22} {'points':>7} {'ms':>9}")
+        with sqlite3.connect(path) as conn:
+            for window in WINDOWS:
+                seconds, df = best_time(lambda: fetch_window(conn, window, now=end))
+                print(f"{window:<22} {len(df):7d} {seconds * 1000:9.1f}")
+            seconds, df = best_time(lambda: raw_month(conn, end))
+            print(f"{'month, raw + LTTB':<22} {len(df):7d} {seconds * 1000:9.1f}")
+        engine.dispose()
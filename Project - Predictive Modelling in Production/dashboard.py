@@ -1,11 +1,197 @@
 # Import the required libraries
-from helping_functions import fetch_data
-from dash import html, dcc, dash_table
-from dash.dependencies import Input, Output
+from helping_functions import fetch_latest_data, fetch_new_data
+from rollups import WINDOWS, fetch_window
+from dash.dependencies import Input, Output, State
+from dash import html, dcc, dash_table, Patch
+from dash.exceptions import PreventUpdate
+from pandas.errors import DatabaseError
+from collections import deque
 import plotly.graph_objs as go
+import threading
+import logging
 import sqlite3
+import time
 import dash
 
+# Logger of the cache refresh
+logger = logging.getLogger(__name__)
+
+# Number of readings shown, and seconds between two refreshes of the cache (and of the clients)
+WINDOW_SIZE = 16
+REFRESH_INTERVAL = 1
+
+# Seconds a fetched history window is served before being fetched again
+HISTORY_REFRESH = 30
+
+
+# Latest readings shared by all the clients
+class LiveWindow:
+    """
+    Keeps the last readings of the database in memory, refreshed by one background thread with the records
+    stored since the previous refresh. The clients read the new readings from here, so the database is
+    queried once per tick whatever the number of open dashboards.
+    """
+
+    def __init__(self, database, size, interval):
+        """
+        :param database: the path of the SQLite database
+        :param size: the number of readings kept
+        :param interval: the seconds between two refreshes
+        """
+        self.database = database
+        self.interval = interval
+        self.rows = deque(maxlen=size)
+        self.last_id = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def refresh(self):
+        """
+        Fetch the records stored since the last refresh (the latest window on the first one)
+        :return: None
+        """
+        with sqlite3.connect(self.database) as conn:
+            if self.last_id:
+                df = fetch_new_data(connection=conn, last_id=self.last_id)
+            else:
+                df = fetch_latest_data(connection=conn, limit=self.rows.maxlen)
+        if len(df):
+            with self.lock:
+                self.rows.extend(df.to_dict('records'))
+                self.last_id = int(df['id'].max())
+
+    def since(self, last_id):
+        """
+        Get the readings a client has not received yet
+        :param last_id: the id of the last reading received by the client
+        :return: the new readings, oldest first, and the id of the last reading of the window
+        """
+        with self.lock:
+            return [row for row in self.rows if row['id'] > last_id], self.last_id
+
+    def run(self):
+        """
+        Refresh the window every interval
+        :return: None
+        """
+        while True:
+            try:
+                self.refresh()
+            except (sqlite3.Error, DatabaseError, ValueError):
+                # The app has not created the database yet
+                logger.exception("Refreshing the dashboard window failed")
+            time.sleep(self.interval)
+
+    def start(self):
+        """
+        Start the background refresh
+        :return: None
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="dashboard-window", daemon=True)
+            self.thread.start()
+
+
+# Score history windows shared by all the clients
+class WindowCache:
+    """
+    Keeps each fetched time window for `ttl` seconds, so a window is queried once per refresh whatever the
+    number of open dashboards.
+    """
+
+    def __init__(self, database, ttl):
+        """
+        :param database: the path of the SQLite database
+        :param ttl: the seconds a window is kept
+        """
+        self.database = database
+        self.ttl = ttl
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def get(self, window):
+        """
+        Get the scores of a time window, fetched again once expired
+        :param window: the name of the window, a key of WINDOWS
+        :return: pandas dataframe of the window
+        """
+        with self.lock:
+            expires, df = self.windows.get(window, (0, None))
+            if time.monotonic() >= expires:
+                with sqlite3.connect(self.database) as conn:
+                    df = fetch_window(connection=conn, window=window)
+                self.windows[window] = (time.monotonic() + self.ttl, df)
+            return df
+
+
+def build_figure(title='Score Variation Over Time'):
+    """
+    Create the line plot of the score with its color bands, without points
+    :param title: the title of the plot
+    :return: plotly figure
+    """
+    # Create line plot with custom color scale and color bands
+    line_plot = go.Figure()
+
+    # Add line trace
+    line_plot.add_trace(go.Scatter(x=[], y=[], mode='lines', name='Score'))
+
+    # Define score levels and corresponding colors
+    score_levels = [0, 1, 3, 5, 7, 10]
+    colors = ['darkred', 'red', 'yellow', 'orange', 'green']
+
+    # Add color bands
+    for i in range(len(score_levels) - 1):
+        line_plot.add_shape(
+            type="rect",
+            xref="paper",
+            yref="y",
+            x0=0,
+            x1=1,
+            y0=score_levels[i],
+            y1=score_levels[i+1],
+            fillcolor=colors[i],
+            opacity=0.5,
+            layer="below",
+            line=dict(width=0),
+        )
+
+    # Customize layout of the plot
+    line_plot.update_layout(
+        title=dict(
+            text=title,  # Set plot title
+            font=dict(
+                family='Arial, sans-serif',  # Set font family
+                size=20,  # Set font size
+                color='black'
+            )
+        ),  # Set plot title
+        xaxis_title='Timestamp',  # Set title for x-axis
+        yaxis_title='Score',  # Set title for y-axis
+        xaxis=dict(
+            showgrid=False,  # Show gridlines on x-axis
+            zeroline=False,  # Hide the zero line
+        ),
+        yaxis=dict(
+            showgrid=False,  # Show gridlines on y-axis
+            zeroline=False,  # Hide the zero line
+        ),
+        plot_bgcolor='white',  # Set background color of the plot
+        paper_bgcolor='white',  # Set background color of the paper
+        font=dict(family='Arial, sans-serif', size=12, color='black'),  # Set font family, size, and color
+        margin=dict(l=50, r=50, t=50, b=50),  # Set margins
+    )
+
+    return line_plot
+
+
+# Start the shared window of readings
+live_window = LiveWindow("main.db", WINDOW_SIZE, REFRESH_INTERVAL)
+live_window.start()
+
+# Shared history windows
+window_cache = WindowCache("main.db", HISTORY_REFRESH)
+
 # Initialize the Dash app
 app = dash.Dash(__name__)
 
@@ -26,8 +212,8 @@ app.layout = html.Div(style={'font-family': 'Arial, sans-serif'},
                                    children=[
                                        html.Div(className="plot-container",
                                                 style={'flex': '1', 'padding': '20px'},
-                                                children=[dcc.Graph(id='line-plot', style={'width': '100%',
-                                                                                           'height': '650px'})]
+                                                children=[dcc.Graph(id='line-plot', figure=build_figure(),
+                                                                    style={'width': '100%', 'height': '650px'})]
                                                 ),
                                        html.Div(className="table-container",
                                                 style={'flex': '1', 'padding': '15px', 'text-align': 'center'},
@@ -59,89 +245,93 @@ app.layout = html.Div(style={'font-family': 'Arial, sans-serif'},
                                                             'overflowX': 'auto',
                                                             'margin': 'auto'
                                                         },
+                                                        data=[],
                                                         page_size=30,  # Adjust as needed
                                                     )
                                                 ])
                                    ]
                                    ),
+                          html.Div(className="history-container",
+                                   style={'padding': '20px', 'text-align': 'center'},
+                                   children=[
+                                       html.H2("Score History"),
+                                       dcc.RadioItems(id='history-window',
+                                                      options=[{'label': window.capitalize(), 'value': window}
+                                                               for window in WINDOWS],
+                                                      value='day',
+                                                      inline=True),
+                                       dcc.Graph(id='history-plot', style={'width': '100%', 'height': '500px'})
+                                   ]
+                                   ),
                           html.Footer(style={'background-color': '#05668D', 'color': '#ebf2fa', 'padding': '10px',
                                              'text-align': 'center', 'margin-top': 'auto'},
                                       children=[html.P([html.Strong("Wind"), ". Means the world to us."]),
                                                 html.P(["© 2024 ", html.Strong("VESTAS"), ".Inc"])
                                                 ]),
                           dcc.Interval(id='interval-component',
-                                       interval=5000,  # in milliseconds
+                                       interval=REFRESH_INTERVAL * 1000,  # in milliseconds
+                                       n_intervals=0
+                                       ),
+                          # The last reading received by this client, and the number of rows of its table
+                          dcc.Store(id='client-state', data={'last_id': 0, 'rows': 0}),
+                          dcc.Interval(id='history-interval',
+                                       interval=HISTORY_REFRESH * 1000,  # in milliseconds
                                        n_intervals=0
                                        )
                       ]
                       )
 
 
-# Define callback to update data and plot
+# Define callback to send the new readings to the client
 @app.callback(
     [Output('data-table', 'data'),
-     Output('line-plot', 'figure')],
-    [Input('interval-component', 'n_intervals')]
+     Output('line-plot', 'extendData'),
+     Output('client-state', 'data')],
+    [Input('interval-component', 'n_intervals')],
+    [State('client-state', 'data')]
 )
-def update_data_and_plot(n_intervals):
-    # Connect to the SQLite database
-    with sqlite3.connect("main.db") as conn:
-        # Fetch data from database
-        df = fetch_data(connection=conn)
+def update_data_and_plot(n_intervals, client_state):
+    # Get the readings this client has not received yet from the shared window
+    rows, last_id = live_window.since(client_state['last_id'])
+    if not rows:
+        raise PreventUpdate
 
-    # Create line plot with custom color scale and color bands
-    line_plot = go.Figure()
+    # Add them on top of the table, and drop the rows beyond the window
+    table = Patch()
+    for row in rows:
+        table.prepend(row)
+    table_rows = client_state['rows'] + len(rows)
+    for _ in range(table_rows - WINDOW_SIZE):
+        del table[WINDOW_SIZE]
 
-    # Add line trace
-    line_plot.add_trace(go.Scatter(x=df['timestamp'], y=df['score'], mode='lines', name='Score'))
+    # Append them to the score line, keeping the last points of the window
+    points = dict(x=[[row['timestamp'] for row in rows]], y=[[row['score'] for row in rows]])
 
-    # Define score levels and corresponding colors
-    score_levels = [0, 1, 3, 5, 7, 10]
-    colors = ['darkred', 'red', 'yellow', 'orange', 'green']
+    return table, (points, [0], WINDOW_SIZE), {'last_id': last_id, 'rows': min(table_rows, WINDOW_SIZE)}
 
-    # Add color bands
-    for i in range(len(score_levels) - 1):
-        line_plot.add_shape(
-            type="rect",
-            xref="paper",
-            yref="y",
-            x0=0,
-            x1=1,
-            y0=score_levels[i],
-            y1=score_levels[i+1],
-            fillcolor=colors[i],
-            opacity=0.5,
-            layer="below",
-            line=dict(width=0),
-        )
 
-    # Customize layout of the plot
-    line_plot.update_layout(
-        title=dict(
-            text='Score Variation Over Time',  # Set plot title
-            font=dict(
-                family='Arial, sans-serif',  # Set font family
-                size=20,  # Set font size
-                color='black'
-            )
-        ),  # Set plot title
-        xaxis_title='Timestamp',  # Set title for x-axis
-        yaxis_title='Score',  # Set title for y-axis
-        xaxis=dict(
-            showgrid=False,  # Show gridlines on x-axis
-            zeroline=False,  # Hide the zero line
-        ),
-        yaxis=dict(
-            showgrid=False,  # Show gridlines on y-axis
-            zeroline=False,  # Hide the zero line
-        ),
-        plot_bgcolor='white',  # Set background color of the plot
-        paper_bgcolor='white',  # Set background color of the paper
-        font=dict(family='Arial, sans-serif', size=12, color='black'),  # Set font family, size, and color
-        margin=dict(l=50, r=50, t=50, b=50),  # Set margins
-    )
+# Define callback to plot the selected history window
+@app.callback(
+    Output('history-plot', 'figure'),
+    [Input('history-window', 'value'),
+     Input('history-interval', 'n_intervals')]
+)
+def update_history(window, n_intervals):
+    # Get the window from the shared cache, at most a few hundred points
+    df = window_cache.get(window)
+
+    # Plot the score, the mean score per bucket for the rollups
+    history_plot = build_figure(f'Score Over The Last {window.capitalize()}')
+    history_plot.update_traces(x=df['timestamp'], y=df['score'], selector=dict(name='Score'))
+
+    # Add the band between the min and the max score of the buckets
+    if 'score_min' in df:
+        history_plot.add_trace(go.Scatter(x=df['timestamp'], y=df['score_min'], mode='lines', name='Min',
+                                          line=dict(width=0), showlegend=False))
+        history_plot.add_trace(go.Scatter(x=df['timestamp'], y=df['score_max'], mode='lines', name='Min / max',
+                                          line=dict(width=0), fill='tonexty', fillcolor='rgba(5, 102, 141, 0.3)'))
 
-    return df.to_dict('records'), line_plot
+    return history_plot
 
 
 if __name__ == '__main__':
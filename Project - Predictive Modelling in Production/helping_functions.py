@@ -3,6 +3,9 @@ import pandas as pd
 import numpy as np
 import mlflow
 
+# The measurements of a reading, in the order expected by the model
+FEATURES = ["sound", "temperature", "humidity"]
+
 def pre_processing(json_file):
     """
     Converts a json file into a 2D numpy array
@@ -46,6 +49,61 @@ def validation(data) -> bool:
     else:
         return False  # False, otherwise
 
+def batch_pre_processing(json_data):
+    """
+    Converts a batch of readings into a 2D numpy array
+
+    Args :
+    json_data: either a list of readings, each one a dictionary of sound, temperature, and humidity data or a list of
+    these three values, or a dictionary of columns, {"sound": [...], "temperature": [...], "humidity": [...]}.
+
+    Returns :
+    N x 3 numpy array of floats, raises a ValueError if the batch is malformed.
+    """
+    # Columnar batch
+    if isinstance(json_data, dict):
+        if set(FEATURES) - set(json_data):
+            raise ValueError(f"A columnar batch needs the columns {', '.join(FEATURES)}")
+        columns = [json_data[feature] for feature in FEATURES]
+        if not all(isinstance(column, list) for column in columns) or len({len(column) for column in columns}) != 1:
+            raise ValueError("The columns of the batch must be lists of the same length")
+        rows = list(zip(*columns))
+
+    # Batch of readings
+    elif isinstance(json_data, list):
+        rows = [[reading.get(feature) for feature in FEATURES] if isinstance(reading, dict) else reading
+                for reading in json_data]
+
+    else:
+        raise ValueError("The batch must be a list of readings or a dictionary of columns")
+
+    # Expressing the values in 2D array
+    try:
+        input_data = np.array(rows, dtype=float).reshape(len(rows), len(FEATURES))
+    except (TypeError, ValueError):
+        raise ValueError("Every reading must have a numeric sound, temperature, and humidity")
+
+    return input_data
+
+def batch_validation(data):
+    """
+    Validates a batch of readings, with the ranges of `validation`.
+
+    Args:
+    - data (numpy array): N x 3 array of sound, temperature, and humidity data.
+
+    Returns:
+    - numpy array: N booleans, True where the reading is valid.
+    """
+    # Getting data
+    sound = data[:, 0]
+    temperature = data[:, 1]
+    humidity = data[:, 2]
+
+    # Check each measurement of all the readings at once
+    return ((sound >= 60) & (sound <= 85) & (humidity >= 40) & (humidity <= 60) &
+            (temperature >= 68) & (temperature <= 86))
+
 def check_experiment(prospected_experiment_name):
     """
     Check the experiment's appropriate name and number
@@ -80,31 +138,34 @@ def fetch_data(connection):
     # Return the dataframe
     return df
 
-def store_data(database, storage_model, input_measurements, output_score):
-
+def fetch_latest_data(connection, limit):
+    """
+    Fetch the last records stored and return them as a pandas dataframe
+    :param connection: a database connection
+    :param limit: the number of records fetched
+    :return: pandas dataframe, oldest record first
     """
-    Stores the input/output data in a database.
+    # Query the data, by id since a batch of readings shares one timestamp
+    query = "SELECT * FROM (SELECT * FROM Records ORDER BY id DESC LIMIT ?) ORDER BY id"
 
-    Args:
-    - database: a sqlalchemy database
-    - storage_model: a sqlalchemy database model
-    - input_measurements: a list of measurements where each measurement is containing sound, temperature, and humidity.
-    - output_score: the output score of the model.
+    # Store the data into a pandas dataframe
+    df = pd.read_sql(query, connection, params=(limit,))
 
-    Returns:
-    - None.
-    """
-    # Adjusting values
-    sound = input_measurements[0][0]
-    temperature = input_measurements[0][1]
-    humidity = input_measurements[0][2]
-    score = np.round(output_score[0], decimals=2)
+    # Return the dataframe
+    return df
 
-    # Creating a record using these values
-    record = storage_model(sound=sound, temperature=temperature, humidity=humidity, score=score)
+def fetch_new_data(connection, last_id):
+    """
+    Fetch the records stored after a given one and return them as a pandas dataframe
+    :param connection: a database connection
+    :param last_id: the id of the last record already fetched
+    :return: pandas dataframe, oldest record first
+    """
+    # Query the data
+    query = "SELECT * FROM Records WHERE id > ? ORDER BY id"
 
-    # Add the record to the database
-    database.session.add(record)
-    database.session.commit()
+    # Store the data into a pandas dataframe
+    df = pd.read_sql(query, connection, params=(last_id,))
 
-    return None
+    # Return the dataframe
+    return df
@@ -0,0 +1,203 @@
+# Importing the required libraries
+from sqlalchemy import event
+from datetime import datetime as dt
+import threading
+import logging
+import time
+
+# Logger of the ingestion worker
+logger = logging.getLogger(__name__)
+
+
+def configure_sqlite(engine, journal_mode="WAL", synchronous="NORMAL"):
+    """
+    Set the journal mode and the synchronous level of every new connection of a SQLite engine
+    :param engine: a sqlalchemy engine, before its first connection
+    :param journal_mode: WAL lets the dashboard read while the app writes, and commits append to the log
+    :param synchronous: NORMAL only syncs the log at checkpoints, a power loss can lose the last commits
+    :return: None
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.close()
+
+
+class IngestionQueue:
+    """
+    Buffers the scored readings in memory and inserts them from a background thread, so that a request
+    no longer pays a commit (and its fsync) per reading.
+
+    The pending readings are written with one executemany and one commit once `batch_size` of them are
+    waiting, or `flush_interval` seconds after the previous write. When `max_pending` readings wait, the
+    requests block until the worker catches up. The readings still pending are written when it stops.
+
+    A failed write never drops the readings: when `after_insert` fails they are inserted without it and
+    passed again to `after_insert` with the next write (every flush interval, even without new readings),
+    and when the insert itself fails they go back to the front of the queue for the next write. Past
+    `max_pending` readings awaiting `after_insert`, the oldest are given up (see rollups_match).
+    """
+
+    def __init__(self, engine, table, batch_size=500, flush_interval=1.0, max_pending=50000, after_insert=None):
+        """
+        :param engine: the sqlalchemy engine of the database
+        :param table: the sqlalchemy table receiving the readings
+        :param batch_size: the number of pending readings triggering a write
+        :param flush_interval: the maximum seconds a reading waits before being written
+        :param max_pending: the number of pending readings blocking the requests
+        :param after_insert: a function called with the connection and the readings of each write, in its transaction
+        """
+        self.engine = engine
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.after_insert = after_insert
+        self.pending = []
+        self.after_insert_pending = []
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.stopping = False
+        self.thread = None
+
+        # Counters of the queue: readings written, failed writes (retried), readings written without after_insert
+        # (retried with the next writes), and readings whose after_insert was given up
+        self.written = 0
+        self.failed = 0
+        self.skipped_after_insert = 0
+        self.dropped_after_insert = 0
+
+    def put(self, input_measurements, output_scores):
+        """
+        Add scored readings to the queue, stamped with their arrival time
+        :param input_measurements: a list of measurements where each measurement is containing sound, temperature, and humidity.
+        :param output_scores: the output scores of the model, one per measurement.
+        :return: None
+        """
+        timestamp = dt.utcnow()
+        rows = [{"timestamp": timestamp, "sound": sound, "temperature": temperature, "humidity": humidity,
+                 "score": round(float(score), 2)}
+                for (sound, temperature, humidity), score in zip(input_measurements, output_scores)]
+
+        with self.condition:
+            while len(self.pending) >= self.max_pending and self.thread is not None and not self.stopping:
+                self.condition.wait()
+            self.pending.extend(rows)
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify_all()
+
+    def start(self):
+        """
+        Start the background worker
+        :return: None
+        """
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="ingestion", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=30.0):
+        """
+        Stop the background worker, then write the pending readings
+        :param timeout: the maximum seconds to wait for the worker
+        :return: None
+        """
+        if self.thread is not None:
+            with self.condition:
+                self.stopping = True
+                self.condition.notify_all()
+            self.thread.join(timeout)
+            self.thread = None
+        self.flush()
+
+    def run(self):
+        """
+        Write the pending readings by batches until stopped
+        :return: None
+        """
+        while True:
+            with self.condition:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self.pending) < self.batch_size and not self.stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if self.stopping:
+                    return
+            self.flush()
+
+    def flush(self):
+        """
+        Write all the pending readings, one executemany and one commit per batch, and call after_insert with
+        them and the readings whose after_insert failed before
+        :return: the number of readings written
+        """
+        with self.write_lock:
+            with self.condition:
+                rows, self.pending = self.pending, []
+                self.condition.notify_all()
+            retried, self.after_insert_pending = self.after_insert_pending, []
+            if not rows and not retried:
+                return 0
+
+            try:
+                self.write(rows, None if self.after_insert is None else retried + rows)
+            except Exception:
+                if self.after_insert is None:
+                    return self.requeue(rows)
+                logger.exception("Writing %d readings with after_insert failed, inserting them without it", len(rows))
+                try:
+                    self.write(rows, None)
+                except Exception:
+                    self.defer_after_insert(retried)
+                    return self.requeue(rows)
+                self.skipped_after_insert += len(rows)
+                self.defer_after_insert(retried + rows)
+
+            self.written += len(rows)
+            return len(rows)
+
+    def write(self, rows, after_insert_rows):
+        """
+        Insert readings in one transaction
+        :param rows: the list of readings
+        :param after_insert_rows: the readings to call after_insert with in the same transaction, None not to call it
+        :return: None
+        """
+        with self.engine.begin() as connection:
+            for start in range(0, len(rows), self.batch_size):
+                connection.execute(self.table.insert(), rows[start:start + self.batch_size])
+            if after_insert_rows is not None:
+                self.after_insert(connection, after_insert_rows)
+
+    def defer_after_insert(self, rows):
+        """
+        Keep inserted readings whose after_insert failed for the next write, the newest max_pending of them
+        :param rows: the list of readings, oldest first
+        :return: None
+        """
+        dropped = len(rows) - self.max_pending
+        if dropped > 0:
+            logger.error("Giving up after_insert for %d readings", dropped)
+            self.dropped_after_insert += dropped
+            rows = rows[dropped:]
+        self.after_insert_pending = rows
+
+    def requeue(self, rows):
+        """
+        Put readings that could not be written back in front of the queue, for the next write
+        :param rows: the list of readings
+        :return: 0, no reading written
+        """
+        logger.exception("Writing %d readings to the database failed, they will be retried", len(rows))
+        self.failed += 1
+        with self.condition:
+            self.pending[:0] = rows
+        return 0
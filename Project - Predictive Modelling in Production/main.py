@@ -1,11 +1,16 @@
 # Importing the required libraries
-from helping_functions import pre_processing, validation, check_experiment, store_data
+from helping_functions import pre_processing, validation, check_experiment, batch_pre_processing, batch_validation
+from ingestion import IngestionQueue, configure_sqlite
+from rollups import update_rollups, rebuild_rollups, rollups_match
+from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime as dt
-from flask import Flask, request
+from telemetry import TelemetrySink
+from functools import partial
 from pathlib import Path
 import numpy as np
 import warnings
+import atexit
 import mlflow
 
 # Ignore the warnings
@@ -20,7 +25,15 @@ model = mlflow.sklearn.load_model(f"{path}/models/Linear Regression")
 
 # Start Tracking
 experiment_name = check_experiment("Linear Regression")
-mlflow.create_experiment(experiment_name)
+experiment_id = mlflow.create_experiment(experiment_name)
+
+# Logging the predictions in batches from a background worker: one run per 100 predictions, or per minute
+# (started by the first prediction, in the process serving it)
+telemetry = TelemetrySink(experiment_id, batch_size=100, flush_interval=60.0)
+atexit.register(telemetry.stop)
+
+# Maximum number of readings accepted by the PREDICT BATCH route
+MAX_BATCH_SIZE = 10000
 
 # Initiating the flask app
 app = Flask(__name__)
@@ -30,12 +43,23 @@ app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}/main.db'
 db = SQLAlchemy(app)
 
+# Writing the readings by batches: every second, or as soon as 500 readings are waiting
+# (overridden by the FLASK_INGESTION_BATCH_SIZE and FLASK_INGESTION_FLUSH_INTERVAL environment variables)
+app.config['INGESTION_BATCH_SIZE'] = 500
+app.config['INGESTION_FLUSH_INTERVAL'] = 1.0
+app.config.from_prefixed_env()
+
+# WAL journal and NORMAL synchronous on every connection of the database
+with app.app_context():
+    engine = db.engine
+configure_sqlite(engine)
+
 
 # Creating Storage class, the default database
 class Storage(db.Model):
     __tablename__ = 'RECORDS'
     id = db.Column(db.Integer, primary_key=True)
-    timestamp = db.Column(db.DateTime, default=dt.utcnow())
+    timestamp = db.Column(db.DateTime, default=dt.utcnow(), index=True)
     sound = db.Column(db.Integer)
     temperature = db.Column(db.Integer)
     humidity = db.Column(db.Integer)
@@ -49,6 +73,45 @@ class Storage(db.Model):
         self.score = score
 
 
+# Creating Rollup class, the count, sum, min and max of the scores per time bucket
+class Rollup(db.Model):
+    __tablename__ = 'ROLLUPS'
+    resolution = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer)
+    score_sum = db.Column(db.Float)
+    score_min = db.Column(db.Float)
+    score_max = db.Column(db.Float)
+
+
+# The ingestion of the scored readings, the rollups being updated in the same transaction (started by start_app)
+ingestion = IngestionQueue(engine, Storage.__table__, batch_size=app.config['INGESTION_BATCH_SIZE'],
+                           flush_interval=app.config['INGESTION_FLUSH_INTERVAL'],
+                           after_insert=partial(update_rollups, Rollup.__table__))
+
+
+def start_app():
+    """
+    Prepare the database and start the ingestion worker, once per serving process (importing the app does neither)
+    Called by `python main.py`, and by the other servers through the app factory syntax,
+    e.g. gunicorn "main:start_app()" or flask --app "main:start_app()" run
+    :return: the flask app
+    """
+    # Creating the tables, the index of the timestamps of a database created before it, and the rollups of the
+    # readings stored before them or written while their update failed
+    with app.app_context():
+        db.create_all()
+    with engine.begin() as connection:
+        connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS "ix_RECORDS_timestamp" ON "RECORDS" (timestamp)')
+        if not rollups_match(connection):
+            rebuild_rollups(connection)
+
+    # Starting the ingestion of the scored readings, the pending ones written when the process exits
+    ingestion.start()
+    atexit.register(ingestion.stop)
+    return app
+
+
 # Setting the API routes
 # The index route
 @app.route('/', methods=['GET'])
@@ -63,24 +126,14 @@ def predict():
 
     # Validating the data
     if validation(input_data):
-        # Set the experiment as the default experiment
-        mlflow.set_experiment(f"{experiment_name}")
-
-        # Starting a new run
-        with mlflow.start_run():
-            # Getting model predictions
-            output_data = model.predict(input_data)
-
-            # Logging inputs
-            mlflow.log_params({"Sound": input_data[0][0]})
-            mlflow.log_params({"Temperature": input_data[0][1]})
-            mlflow.log_params({"Humidity": input_data[0][2]})
+        # Getting model predictions
+        output_data = model.predict(input_data)
 
-            # Logging output
-            mlflow.log_params({"Score": np.round(output_data[0], decimals=2)})
+        # Tracking the inputs and the output, logged to mlflow by the telemetry worker
+        telemetry.record(*input_data[0][:3], np.round(output_data[0], decimals=2))
 
         # Storing the data
-        store_data(db, Storage, input_data, output_data)
+        ingestion.put(input_data, output_data)
 
         # Returning the values
         response = f'The predicted value for these measures is : {np.round(output_data[0], decimals=2)}'
@@ -90,10 +143,43 @@ def predict():
     else:
         return "The input data is not valid"
 
+# The PREDICT BATCH route
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    # Getting the actual data as a N x 3 matrix
+    try:
+        input_data = batch_pre_processing(request.get_json())
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    if len(input_data) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"A batch holds at most {MAX_BATCH_SIZE} readings"}), 413
+
+    # Validating all the readings at once
+    valid = batch_validation(input_data)
+    valid_data = input_data[valid]
+
+    # Scoring the valid readings in one call of the model, and storing them
+    scores = np.full(len(input_data), np.nan)
+    if len(valid_data):
+        output_data = model.predict(valid_data)
+        scores[valid] = np.round(output_data, decimals=2)
+        ingestion.put(valid_data.tolist(), output_data)
+
+        # Tracking the inputs and the outputs
+        for measurements, score in zip(valid_data.tolist(), scores[valid].tolist()):
+            telemetry.record(*measurements, score)
+
+    # Returning the values, null for the invalid readings
+    return jsonify({
+        "count": len(input_data),
+        "valid": int(valid.sum()),
+        "invalid_rows": np.flatnonzero(~valid).tolist(),
+        "scores": [None if np.isnan(score) else score for score in scores.tolist()],
+    })
+
 
 # Launching the flask app
 if __name__ == "__main__":
     # Run the Flask application
-    with app.app_context():
-        db.create_all()
+    start_app()
     app.run(debug=True)
@@ -0,0 +1,183 @@
+# Importing the required libraries
+from datetime import datetime as dt, timedelta, timezone
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy import func, text
+import pandas as pd
+import numpy as np
+
+# Bucket sizes of the rollups, in seconds (1 minute, 15 minutes, 1 hour)
+RESOLUTIONS = [60, 900, 3600]
+
+# Selectable windows: (duration, resolution of the rollup served, None for the raw readings)
+WINDOWS = {
+    "hour": (timedelta(hours=1), None),
+    "day": (timedelta(days=1), 60),
+    "week": (timedelta(weeks=1), 900),
+    "month": (timedelta(days=30), 3600),
+}
+
+# Maximum number of points of a plotted window
+MAX_POINTS = 500
+
+
+def bucket_start(timestamp, resolution):
+    """
+    Get the start of the bucket of a timestamp
+    :param timestamp: a naive UTC datetime
+    :param resolution: the bucket size in seconds
+    :return: the start of the bucket, in seconds since the epoch
+    """
+    seconds = int(timestamp.replace(tzinfo=timezone.utc).timestamp())
+    return seconds - seconds % resolution
+
+
+def aggregate(rows, resolutions=RESOLUTIONS):
+    """
+    Aggregate readings per bucket of every resolution
+    :param rows: a list of readings, dictionaries with a timestamp and a score
+    :param resolutions: the bucket sizes in seconds
+    :return: a list of rollup rows (resolution, bucket, count, sum, min and max of the scores)
+    """
+    buckets = {}
+    for row in rows:
+        score = row["score"]
+        for resolution in resolutions:
+            key = (resolution, bucket_start(row["timestamp"], resolution))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [1, score, score, score]
+            else:
+                bucket[0] += 1
+                bucket[1] += score
+                bucket[2] = min(bucket[2], score)
+                bucket[3] = max(bucket[3], score)
+
+    return [{"resolution": resolution, "bucket": bucket, "count": count, "score_sum": score_sum,
+             "score_min": score_min, "score_max": score_max}
+            for (resolution, bucket), (count, score_sum, score_min, score_max) in buckets.items()]
+
+
+def update_rollups(table, connection, rows):
+    """
+    Add inserted readings to the rollups, merged with the stored buckets by one upsert per bucket
+    :param table: the sqlalchemy table of the rollups
+    :param connection: a sqlalchemy connection, in the transaction inserting the readings
+    :param rows: the list of readings inserted
+    :return: None
+    """
+    rollups = aggregate(rows)
+    if not rollups:
+        return
+
+    # SQLite min() and max() with two arguments return the smallest and the largest
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.resolution, table.c.bucket],
+        set_={
+            "count": table.c.count + statement.excluded.count,
+            "score_sum": table.c.score_sum + statement.excluded.score_sum,
+            "score_min": func.min(table.c.score_min, statement.excluded.score_min),
+            "score_max": func.max(table.c.score_max, statement.excluded.score_max),
+        },
+    )
+    connection.execute(statement, rollups)
+
+
+def rebuild_rollups(connection):
+    """
+    Compute the rollups of all the stored readings, for a database filled before they existed or whose
+    rollups missed readings (see rollups_match)
+    :param connection: a sqlalchemy connection
+    :return: None
+    """
+    connection.execute(text("DELETE FROM ROLLUPS"))
+    for resolution in RESOLUTIONS:
+        connection.execute(text(
+            "INSERT INTO ROLLUPS (resolution, bucket, count, score_sum, score_min, score_max) "
+            "SELECT :resolution, CAST(strftime('%s', timestamp) AS INTEGER) / :resolution * :resolution AS start, "
+            "COUNT(*), SUM(score), MIN(score), MAX(score) "
+            "FROM RECORDS WHERE score IS NOT NULL GROUP BY start"
+        ), {"resolution": resolution})
+
+
+def rollups_match(connection):
+    """
+    Check that the rollups count every stored reading, on the coarsest resolution
+    :param connection: a sqlalchemy connection
+    :return: True when they do
+    """
+    readings = connection.execute(text("SELECT COUNT(*) FROM RECORDS WHERE score IS NOT NULL")).scalar()
+    counted = connection.execute(text("SELECT COALESCE(SUM(count), 0) FROM ROLLUPS WHERE resolution = :resolution"),
+                                 {"resolution": RESOLUTIONS[-1]}).scalar()
+    return readings == counted
+
+
+def lttb(x, y, threshold):
+    """
+    Select the points of a series that keep its shape, with the Largest-Triangle-Three-Buckets algorithm
+    :param x: numpy array of the increasing abscissas
+    :param y: numpy array of the values
+    :param threshold: the number of points kept
+    :return: numpy array of the indices of the kept points, first and last included
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # The points between the first and the last one are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+
+        # Keep the point of the bucket making the largest triangle with the previous kept point and the
+        # average of the next bucket
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) -
+                       (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def fetch_window(connection, window, now=None, max_points=MAX_POINTS):
+    """
+    Fetch the scores of a time window and return them as a pandas dataframe of at most max_points rows
+    :param connection: a database connection
+    :param window: hour (the readings), day, week or month (the mean, min and max score per rollup bucket)
+    :param now: the end of the window, a naive UTC datetime, now by default
+    :param max_points: the number of rows above which the window is downsampled
+    :return: pandas dataframe with the timestamp and the score, and the score_min and score_max of the rollups
+    """
+    duration, resolution = WINDOWS[window]
+    start = (now or dt.utcnow()) - duration
+
+    if resolution is None:
+        # The readings, through the index of the timestamps
+        query = "SELECT timestamp, score FROM Records WHERE timestamp >= ? ORDER BY timestamp"
+        df = pd.read_sql(query, connection, params=(start.isoformat(sep=" "),))
+        df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601")
+    else:
+        # The buckets of the rollup
+        query = ("SELECT bucket, count, score_sum, score_min, score_max FROM Rollups "
+                 "WHERE resolution = ? AND bucket >= ? ORDER BY bucket")
+        rollups = pd.read_sql(query, connection, params=(resolution, bucket_start(start, resolution)))
+        df = pd.DataFrame({"timestamp": pd.to_datetime(rollups["bucket"], unit="s"),
+                           "score": rollups["score_sum"] / rollups["count"],
+                           "score_min": rollups["score_min"], "score_max": rollups["score_max"]})
+
+    if len(df) <= max_points:
+        return df
+
+    # Downsampling the scores, each kept point carries the extremes of the points up to the next one
+    selected = lttb(df["timestamp"].to_numpy(dtype="int64") / 1e9, df["score"].to_numpy(), max_points)
+    downsampled = df.iloc[selected].reset_index(drop=True)
+    if resolution is not None:
+        downsampled["score_min"] = np.minimum.reduceat(df["score_min"].to_numpy(), selected)
+        downsampled["score_max"] = np.maximum.reduceat(df["score_max"].to_numpy(), selected)
+    return downsampled
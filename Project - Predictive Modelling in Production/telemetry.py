@@ -0,0 +1,163 @@
+# Importing the required libraries
+from mlflow.entities import Metric, RunStatus
+from mlflow.tracking import MlflowClient
+import threading
+import logging
+import queue
+import time
+
+# Logger of the telemetry worker
+logger = logging.getLogger(__name__)
+
+# Maximum number of metrics MLflow accepts in one log_batch call
+MAX_METRICS_PER_BATCH = 1000
+
+
+class TelemetrySink:
+    """
+    Buffers the prediction events in memory and logs them to MLflow from a background thread,
+    one run per batch of events, so that the requests never wait on the tracking store.
+
+    A batch is flushed once it holds `batch_size` events, or `flush_interval` seconds after its
+    first event. Each event becomes one step of the sound, temperature, humidity and score metrics
+    of the run, logged with `log_batch` (instead of one run and four params per prediction).
+
+    The worker starts with the first recorded event, so that only the processes serving predictions run one
+    (not the parent process of the debug reloader, which imports the app without serving it).
+    """
+
+    def __init__(self, experiment_id, batch_size=100, flush_interval=60.0, max_events=10000):
+        """
+        :param experiment_id: the MLflow experiment receiving the runs
+        :param batch_size: the number of events logged per run
+        :param flush_interval: the maximum seconds an event waits before being logged
+        :param max_events: the capacity of the buffer, events are dropped when it is full
+        """
+        self.experiment_id = experiment_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.events = queue.Queue(maxsize=max_events)
+        self.stopping = threading.Event()
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.client = None
+
+        # Counters of the sink
+        self.logged = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, sound, temperature, humidity, score):
+        """
+        Add a prediction event to the buffer without blocking
+        :param sound: the sound measurement
+        :param temperature: the temperature measurement
+        :param humidity: the humidity measurement
+        :param score: the predicted score
+        :return: None
+        """
+        event = (int(time.time() * 1000), float(sound), float(temperature), float(humidity), float(score))
+        if self.thread is None and not self.stopping.is_set():
+            self.start()
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        """
+        Start the background worker, and its MLflow client
+        :return: None
+        """
+        with self.start_lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.stopping.clear()
+            self.client = MlflowClient()
+            self.thread = threading.Thread(target=self.run, name="mlflow-telemetry", daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=30.0):
+        """
+        Stop the background worker once the buffered events are logged
+        :param timeout: the maximum seconds to wait for the last flush
+        :return: None
+        """
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def next_batch(self):
+        """
+        Wait for a first event, then collect events until the batch is full or the flush interval elapsed
+        :return: the list of events of the batch
+        """
+        try:
+            batch = [self.events.get(timeout=1.0)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size and not self.stopping.is_set():
+            try:
+                batch.append(self.events.get(timeout=min(1.0, max(0.0, deadline - time.monotonic()))))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    break
+        return batch
+
+    def run(self):
+        """
+        Log batches until stopped, then log what is left in the buffer
+        :return: None
+        """
+        while not self.stopping.is_set():
+            batch = self.next_batch()
+            if batch:
+                self.flush(batch)
+
+        # Final flush on shutdown
+        batch = []
+        while True:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(batch), self.batch_size):
+            self.flush(batch[start:start + self.batch_size])
+
+    def flush(self, batch):
+        """
+        Log a batch of events as one MLflow run
+        :param batch: the list of events (timestamp in ms, sound, temperature, humidity, score)
+        :return: None
+        """
+        client = self.client
+        try:
+            run = client.create_run(self.experiment_id, start_time=batch[0][0],
+                                    tags={"mlflow.runName": f"{len(batch)} predictions"})
+
+            # One step per event of the run for every measure, then the summary of the batch
+            metrics = []
+            for step, (timestamp, sound, temperature, humidity, score) in enumerate(batch):
+                metrics += [Metric("Sound", sound, timestamp, step),
+                            Metric("Temperature", temperature, timestamp, step),
+                            Metric("Humidity", humidity, timestamp, step),
+                            Metric("Score", score, timestamp, step)]
+            scores = [event[4] for event in batch]
+            last_timestamp = batch[-1][0]
+            metrics += [Metric("Predictions", len(batch), last_timestamp, 0),
+                        Metric("Score mean", sum(scores) / len(scores), last_timestamp, 0),
+                        Metric("Score min", min(scores), last_timestamp, 0),
+                        Metric("Score max", max(scores), last_timestamp, 0)]
+
+            for start in range(0, len(metrics), MAX_METRICS_PER_BATCH):
+                client.log_batch(run.info.run_id, metrics=metrics[start:start + MAX_METRICS_PER_BATCH])
+            client.set_terminated(run.info.run_id, RunStatus.to_string(RunStatus.FINISHED), end_time=last_timestamp)
+            self.logged += len(batch)
+
+        except Exception:
+            # The tracking store is unavailable, the batch is dropped rather than blocking the service
+            logger.exception("Logging %d prediction events to MLflow failed", len(batch))
+            self.failed += len(batch)
@@ -0,0 +1,241 @@
+# Importing the ingestion and rollup modules (the app itself needs a running MLflow) and the libraries the tests need
+from rollups import RESOLUTIONS, update_rollups, rebuild_rollups, rollups_match, lttb, fetch_window
+from sqlalchemy import MetaData, Table, Column, Integer, Float, DateTime, create_engine, select, text
+from ingestion import IngestionQueue, configure_sqlite
+from datetime import datetime as dt, timedelta
+from functools import partial
+import numpy as np
+import threading
+import pytest
+import time
+
+# Tables of the app, as declared by its models
+metadata = MetaData()
+records = Table(
+    "RECORDS", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("timestamp", DateTime, index=True),
+    Column("sound", Integer),
+    Column("temperature", Integer),
+    Column("humidity", Integer),
+    Column("score", Float),
+)
+rollups = Table(
+    "ROLLUPS", metadata,
+    Column("resolution", Integer, primary_key=True),
+    Column("bucket", Integer, primary_key=True),
+    Column("count", Integer),
+    Column("score_sum", Float),
+    Column("score_min", Float),
+    Column("score_max", Float),
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """
+    Create a SQLite database holding the tables of the app
+    :param tmp_path: the temporary directory of the test
+    :return: a sqlalchemy engine
+    """
+    engine = create_engine(f"sqlite:///{tmp_path}/test.db")
+    configure_sqlite(engine)
+    metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def stored_rollups(engine):
+    """
+    Read the rollups, ordered by resolution and bucket
+    :param engine: a sqlalchemy engine
+    :return: a list of rollup rows
+    """
+    with engine.connect() as connection:
+        return connection.execute(select(rollups).order_by(rollups.c.resolution, rollups.c.bucket)).all()
+
+
+def readings(n, seed=0):
+    """
+    Draw readings spread over three hours, to fill several buckets of every resolution
+    :param n: the number of readings
+    :param seed: the seed of the random generator
+    :return: a list of readings, ordered by timestamp
+    """
+    rng = np.random.default_rng(seed)
+    start = dt(2026, 10, 18, 9, 0, 0)
+    offsets = np.sort(rng.uniform(0, 3 * 3600, n))
+    return [{"timestamp": start + timedelta(seconds=float(offset)), "sound": int(rng.integers(0, 100)),
+             "temperature": int(rng.integers(0, 40)), "humidity": int(rng.integers(0, 100)),
+             "score": round(float(rng.normal(50, 10)), 2)}
+            for offset in offsets]
+
+
+# Defining a class TestIngestionQueue
+class TestIngestionQueue:
+
+    def test_flush(self, engine):
+        # The pending readings are written with their rollups by one flush
+        ingestion = IngestionQueue(engine, records, after_insert=partial(update_rollups, rollups))
+        ingestion.put([(10, 20, 30), (11, 21, 31)], [1.234, 5.678])
+        assert ingestion.flush() == 2 and ingestion.pending == []
+
+        with engine.connect() as connection:
+            stored = connection.execute(select(records.c.sound, records.c.score).order_by(records.c.id)).all()
+            assert rollups_match(connection)
+        assert stored == [(10, 1.23), (11, 5.68)]
+        assert ingestion.written == 2 and ingestion.flush() == 0
+
+    def test_batch_written_by_the_worker(self, engine):
+        # A full batch is written by the worker without waiting for the flush interval
+        ingestion = IngestionQueue(engine, records, batch_size=3, flush_interval=60.0)
+        ingestion.start()
+        ingestion.put([(1, 2, 3)] * 3, [1.0, 2.0, 3.0])
+        deadline = time.monotonic() + 5
+        while ingestion.written < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert ingestion.written == 3
+
+        # The readings still pending are written when it stops
+        ingestion.put([(4, 5, 6)], [4.0])
+        ingestion.stop()
+        assert ingestion.written == 4
+
+    def test_failed_after_insert(self, engine):
+        # The readings are inserted without the rollups when their update fails, and their update is retried
+        # with the next writes until it succeeds
+        available = False
+
+        def flaky_update(connection, rows):
+            if not available:
+                raise RuntimeError("rollups unavailable")
+            update_rollups(rollups, connection, rows)
+
+        ingestion = IngestionQueue(engine, records, after_insert=flaky_update)
+        ingestion.put([(1, 2, 3), (4, 5, 6)], [1.0, 2.0])
+        assert ingestion.flush() == 2
+        ingestion.put([(7, 8, 9)], [3.0])
+        assert ingestion.flush() == 1
+        assert ingestion.skipped_after_insert == 3 and len(ingestion.after_insert_pending) == 3
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT COUNT(*) FROM RECORDS")).scalar() == 3
+            assert not rollups_match(connection)
+
+        # A flush without new readings brings the rollups up to date
+        available = True
+        assert ingestion.flush() == 0
+        assert ingestion.after_insert_pending == []
+        with engine.connect() as connection:
+            assert rollups_match(connection)
+
+    def test_failed_after_insert_bounded(self, engine):
+        # At most max_pending readings wait for their after_insert, the oldest are given up
+        def failing_update(connection, rows):
+            raise RuntimeError("rollups unavailable")
+
+        ingestion = IngestionQueue(engine, records, max_pending=3, after_insert=failing_update)
+        for score in range(5):
+            ingestion.put([(1, 2, 3)], [float(score)])
+            ingestion.flush()
+        assert [row["score"] for row in ingestion.after_insert_pending] == [2.0, 3.0, 4.0]
+        assert ingestion.dropped_after_insert == 2 and ingestion.written == 5
+
+    def test_failed_insert_requeued(self, engine):
+        # Readings that cannot be inserted go back in front of the queue, and are written by the next flush
+        ingestion = IngestionQueue(engine, records)
+        ingestion.put([(1, 2, 3)], [1.0])
+        records.drop(engine)
+        assert ingestion.flush() == 0
+        assert ingestion.failed == 1 and len(ingestion.pending) == 1
+
+        ingestion.put([(4, 5, 6)], [2.0])
+        records.create(engine)
+        assert ingestion.flush() == 2
+        with engine.connect() as connection:
+            assert connection.execute(select(records.c.sound).order_by(records.c.id)).scalars().all() == [1, 4]
+
+    def test_backpressure(self, engine):
+        # A request blocks while max_pending readings wait, until a write makes room
+        ingestion = IngestionQueue(engine, records, batch_size=100, flush_interval=60.0, max_pending=2)
+        ingestion.start()
+        ingestion.put([(1, 2, 3), (4, 5, 6)], [1.0, 2.0])
+        blocked = threading.Thread(target=ingestion.put, args=([(7, 8, 9)], [3.0]))
+        blocked.start()
+        blocked.join(0.2)
+        assert blocked.is_alive()
+
+        assert ingestion.flush() == 2
+        blocked.join(5)
+        assert not blocked.is_alive() and len(ingestion.pending) == 1
+        ingestion.stop()
+        assert ingestion.written == 3
+
+
+# Defining a class TestRollups
+class TestRollups:
+
+    def test_incremental_equals_rebuild(self, engine):
+        # Rollups updated batch by batch hold the same buckets as the ones computed from all the readings
+        rows = readings(2000)
+        with engine.begin() as connection:
+            for start in range(0, len(rows), 137):
+                batch = rows[start:start + 137]
+                connection.execute(records.insert(), batch)
+                update_rollups(rollups, connection, batch)
+        incremental = stored_rollups(engine)
+
+        with engine.begin() as connection:
+            assert rollups_match(connection)
+            rebuild_rollups(connection)
+        rebuilt = stored_rollups(engine)
+
+        assert {row.resolution for row in incremental} == set(RESOLUTIONS)
+        assert len(incremental) == len(rebuilt)
+        for row, expected in zip(incremental, rebuilt):
+            assert (row.resolution, row.bucket, row.count) == (expected.resolution, expected.bucket, expected.count)
+            assert row.score_sum == pytest.approx(expected.score_sum)
+            assert (row.score_min, row.score_max) == (expected.score_min, expected.score_max)
+
+    def test_window_downsampled(self, engine):
+        # A day of minute buckets is downsampled, keeping its ends and the extremes of the scores
+        rows = readings(5000, seed=1)
+        now = rows[-1]["timestamp"]
+        with engine.begin() as connection:
+            connection.execute(records.insert(), rows)
+            rebuild_rollups(connection)
+            full = fetch_window(connection, "day", now)
+            window = fetch_window(connection, "day", now, max_points=50)
+
+        assert len(full) > 50 and len(window) == 50
+        assert window["timestamp"].iloc[0] == full["timestamp"].iloc[0]
+        assert window["timestamp"].iloc[-1] == full["timestamp"].iloc[-1]
+        assert window["score_min"].min() == min(row["score"] for row in rows)
+        assert window["score_max"].max() == max(row["score"] for row in rows)
+
+
+# Defining a class TestLttb
+class TestLttb:
+
+    @pytest.mark.parametrize("n, threshold", [(1000, 500), (1000, 3), (10007, 37), (50, 49)])
+    def test_size_and_endpoints(self, n, threshold):
+        # threshold increasing indices, the first and the last point included, one per bucket in between
+        rng = np.random.default_rng(n)
+        x = np.sort(rng.uniform(0, 1000, n))
+        selected = lttb(x, rng.normal(size=n), threshold)
+
+        assert len(selected) == threshold
+        assert selected[0] == 0 and selected[-1] == n - 1
+        assert np.all(np.diff(selected) > 0)
+        edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+        assert np.array_equal(np.searchsorted(edges, selected[1:-1], side="right"), np.arange(1, threshold - 1))
+
+    @pytest.mark.parametrize("threshold", [0, 2, 100, 150])
+    def test_short_series_kept(self, threshold):
+        # Nothing is dropped when the threshold does not reduce the series
+        assert np.array_equal(lttb(np.arange(100.0), np.zeros(100), threshold), np.arange(100))
+
+    def test_spike_kept(self):
+        # A single outlier makes the largest triangle of its bucket
+        y = np.zeros(1000)
+        y[613] = 10.0
+        assert 613 in lttb(np.arange(1000.0), y, 20)